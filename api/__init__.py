@@ -0,0 +1 @@
+# API package for portfolio rebalancing application 
\ No newline at end of file
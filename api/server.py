@@ -0,0 +1,294 @@
+"""
+Lightweight HTTP API exposing portfolio metrics, rebalancing and price lookup as JSON.
+
+Run with:
+    python -m api.server --port 8000 --workers 8
+"""
+import argparse
+import json
+import logging
+import math
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from services.price_service import PriceService
+from services.price_cache import PriceCache
+from services.fx_service import FxService
+from utils.portfolio_utils import calculate_portfolio_metrics, calculate_rebalancing_metrics, validate_portfolio_data
+from config.settings import app_config
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMN = "Current Price (per share)"
+
+
+class RebalancingAPI:
+    """Request handlers for the rebalancing API, independent of the HTTP layer."""
+
+    def __init__(self, price_service: Optional[PriceService] = None,
+                 fx_service: Optional[FxService] = None,
+                 price_cache: Optional[PriceCache] = None,
+                 price_fetch_workers: int = 16):
+        self.price_service = price_service or PriceService()
+        self.fx_service = fx_service or FxService(app_config.BASE_CURRENCY)
+        self.price_cache = price_cache if price_cache is not None else PriceCache(app_config.PRICE_CACHE_TTL)
+        self.price_fetch_workers = price_fetch_workers
+
+    def _fetch_prices(self, tickers: List[str]) -> Dict[str, float]:
+        return self.price_service.get_portfolio_prices(tickers, max_workers=self.price_fetch_workers)
+
+    def get_prices(self, tickers: List[str]) -> Dict[str, float]:
+        """
+        Get prices for the tickers, fetching only those not already cached.
+
+        Misses are fetched concurrently, and requests missing the same tickers
+        at the same time share one fetch instead of each making their own.
+        """
+        return self.price_cache.get_or_fetch(tickers, self._fetch_prices)
+
+    def _build_frame(self, portfolio: Dict[str, Any], prices: Dict[str, float]) -> pd.DataFrame:
+        """Build a priced portfolio DataFrame from a request payload."""
+        df = pd.DataFrame(_holdings(portfolio))
+        errors = validate_portfolio_data(df)
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        # Validation accepts numeric strings, so convert them before any arithmetic
+        df["Shares Held"] = pd.to_numeric(df["Shares Held"])
+        df["Target Weight (%)"] = pd.to_numeric(df["Target Weight (%)"])
+
+        # Prices given in the request take precedence over live prices
+        live = df["Ticker"].map(prices).astype(float)
+        if PRICE_COLUMN in df.columns:
+            df[PRICE_COLUMN] = pd.to_numeric(df[PRICE_COLUMN], errors="coerce").astype(float).fillna(live)
+        else:
+            df[PRICE_COLUMN] = live
+
+        # Currencies given in the request take precedence over detected ones
+        detected = df["Ticker"].map(self.fx_service.get_ticker_currencies(df["Ticker"].tolist()))
+        if "Currency" in df.columns:
+            df["Currency"] = df["Currency"].where(df["Currency"].notna() & (df["Currency"] != ""), detected)
+        else:
+            df["Currency"] = detected
+        return df
+
+    def _unpriced_tickers(self, portfolios: List[Dict[str, Any]]) -> List[str]:
+        """Collect the tickers across portfolios that have no price in the request."""
+        tickers = []
+        for portfolio in portfolios:
+            try:
+                holdings = _holdings(portfolio)
+            except ValueError:
+                continue  # reported when the portfolio itself is built
+            for holding in holdings:
+                if pd.isna(holding.get(PRICE_COLUMN)) and holding.get("Ticker"):
+                    tickers.append(holding["Ticker"])
+        return tickers
+
+    def _metrics(self, df: pd.DataFrame) -> Dict[str, Any]:
+        fx_rates = self.fx_service.get_fx_rates(df["Currency"].dropna().unique(), self.price_cache)
+        total_value, total_current_weight, total_target_weight = calculate_portfolio_metrics(df, fx_rates)
+        # Holdings without an FX rate would silently drop out of the total
+        errors = validate_portfolio_data(df)
+        if errors:
+            raise ValueError("; ".join(errors))
+        return {
+            "base_currency": self.fx_service.base_currency,
+            "total_value": float(total_value),
+            "total_current_weight": float(total_current_weight),
+            "total_target_weight": float(total_target_weight),
+            "holdings_count": len(df),
+        }
+
+    def portfolio_metrics(self, portfolio: Dict[str, Any]) -> Dict[str, Any]:
+        """Compute metrics for one portfolio payload."""
+        prices = self.get_prices(self._unpriced_tickers([portfolio]))
+        df = self._build_frame(portfolio, prices)
+        summary = self._metrics(df)
+        return {"summary": summary, "holdings": _records(df)}
+
+    def rebalance(self, portfolio: Dict[str, Any], prices: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Compute rebalancing trades for one portfolio payload."""
+        if prices is None:
+            prices = self.get_prices(self._unpriced_tickers([portfolio]))
+        df = self._build_frame(portfolio, prices)
+        summary = self._metrics(df)
+        additional_capital = _additional_capital(portfolio)
+        rebalanced_df = calculate_rebalancing_metrics(df, additional_capital)
+        summary["additional_capital"] = additional_capital
+        return {"summary": summary, "holdings": _records(rebalanced_df)}
+
+    def rebalance_batch(self, portfolios: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Rebalance many portfolios, pricing the union of their tickers once.
+
+        Errors in one portfolio are reported in its slot without failing the batch.
+        """
+        prices = self.get_prices(self._unpriced_tickers(portfolios))
+        results = []
+        for portfolio in portfolios:
+            try:
+                result = self.rebalance(portfolio, prices)
+            except Exception as e:
+                result = {"error": str(e)}
+            if "id" in portfolio:
+                result["id"] = portfolio["id"]
+            results.append(result)
+        return {"results": results}
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Convert a DataFrame into JSON-safe records (NaN becomes null)."""
+    return json.loads(df.to_json(orient="records"))
+
+
+def _holdings(portfolio: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Get the 'holdings' of a portfolio payload, checking it is a list of objects."""
+    holdings = portfolio.get("holdings", [])
+    if not isinstance(holdings, list) or not all(isinstance(h, dict) for h in holdings):
+        raise ValueError("'holdings' must be a list of JSON objects")
+    return holdings
+
+
+def _additional_capital(portfolio: Dict[str, Any]) -> float:
+    """Get the 'additional_capital' of a portfolio payload, checking it is a non-negative number."""
+    value = portfolio.get("additional_capital", 0.0)
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("'additional_capital' must be a number")
+    # Negative capital would sell more shares than are held
+    if not math.isfinite(amount) or amount < 0:
+        raise ValueError("'additional_capital' must be a non-negative number")
+    return amount
+
+
+def _portfolio_list(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Get the 'portfolios' of a batch request, checking it is a list of objects."""
+    portfolios = body.get("portfolios", [])
+    if not isinstance(portfolios, list) or not all(isinstance(p, dict) for p in portfolios):
+        raise ValueError("'portfolios' must be a list of JSON objects")
+    return portfolios
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Routes HTTP requests to the server's RebalancingAPI."""
+
+    server_version = "RebalancerAPI/1.0"
+    protocol_version = "HTTP/1.1"
+    # Every response closes its connection, so idle keep-alive clients never pin pool workers;
+    # the timeout only bounds how long a slow client can take to send its request
+    timeout = 10
+
+    @property
+    def api(self) -> RebalancingAPI:
+        return self.server.api
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif url.path == "/prices":
+            tickers = [t for value in parse_qs(url.query).get("tickers", []) for t in value.split(",") if t]
+            if not tickers:
+                self._send_json(400, {"error": "Query parameter 'tickers' is required"})
+                return
+            self._send_json(200, {"prices": self.api.get_prices(tickers)})
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint: {url.path}"})
+
+    def do_POST(self) -> None:
+        routes = {
+            "/metrics": lambda body: self.api.portfolio_metrics(body),
+            "/rebalance": lambda body: self.api.rebalance(body),
+            "/rebalance/batch": lambda body: self.api.rebalance_batch(_portfolio_list(body)),
+        }
+        route = routes.get(urlparse(self.path).path)
+        if route is None:
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("Request body must be a JSON object")
+            self._send_json(200, route(body))
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            logger.error(f"API error on {self.path}: {e}")
+            self._send_json(500, {"error": str(e)})
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(format % args)
+
+
+class PooledHTTPServer(HTTPServer):
+    """HTTP server that handles connections on a fixed-size thread pool."""
+
+    daemon_threads = True
+
+    def __init__(self, server_address, api: RebalancingAPI, workers: int = 8):
+        super().__init__(server_address, RequestHandler)
+        self.api = api
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-worker")
+
+    def process_request(self, request, client_address) -> None:
+        self.executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+
+def create_server(host: str = app_config.API_HOST, port: int = app_config.API_PORT,
+                  workers: int = app_config.API_WORKERS,
+                  api: Optional[RebalancingAPI] = None) -> PooledHTTPServer:
+    """Create an API server; all workers share the API's price cache."""
+    return PooledHTTPServer((host, port), api or RebalancingAPI(), workers)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the rebalancing API over HTTP.")
+    parser.add_argument("--host", default=app_config.API_HOST)
+    parser.add_argument("--port", type=int, default=app_config.API_PORT)
+    parser.add_argument("--workers", type=int, default=app_config.API_WORKERS)
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.workers)
+    logger.info(f"Rebalancing API listening on http://{args.host}:{args.port} with {args.workers} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
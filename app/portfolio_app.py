@@ -5,12 +5,23 @@ import pandas as pd
 import logging
 import numpy as np
 import streamlit as st
-from typing import Optional, Dict
+from typing import Optional, Dict, Set
 
 from services.price_service import PriceService
 from services.data_service import DataService
+from services.fx_service import FxService
+from services.portfolio_store import PortfolioConflictError, get_portfolio_store
+from services.price_warmup import get_price_warmup
+from services.risk_service import get_risk_service
 from ui.components import PortfolioUIComponents
-from utils.portfolio_utils import calculate_portfolio_metrics, calculate_rebalancing_metrics, validate_portfolio_data
+from utils.portfolio_utils import (
+    calculate_portfolio_metrics,
+    calculate_rebalancing_metrics,
+    find_minimum_capital,
+    sweep_additional_capital,
+)
+from utils.risk_utils import calculate_risk_metrics
+from utils.validation import validate_portfolio
 from config.settings import app_config
 
 logger = logging.getLogger(__name__)
@@ -22,58 +33,145 @@ class PortfolioRebalancerApp:
     def __init__(self):
         """Initialize the application with all required services."""
         self.price_service = PriceService()
-        self._price_cache: Dict[str, float] = {}
-        self.data_service = DataService(app_config.SAVE_FILE)
+        self.price_warmup = get_price_warmup(app_config)
+        self.fx_service = FxService(app_config.BASE_CURRENCY)
+        self._fx_rates: Dict[str, float] = {app_config.BASE_CURRENCY: 1.0}
+        self._stale_prices: Set[str] = set()
+        self._full_run = False
         self.ui = PortfolioUIComponents()
+        self.data_service = self._create_data_service()
         self._portfolio_df = self.data_service.load_portfolio_data()
     
+    def _create_data_service(self) -> DataService:
+        """Create the data service for the configured storage backend."""
+        if app_config.STORAGE_BACKEND == "sqlite":
+            account_id = self.ui.render_account_selector(app_config.DEFAULT_ACCOUNT)
+            return DataService(
+                app_config.SAVE_FILE,
+                store=get_portfolio_store(app_config.DATABASE_FILE),
+                account_id=account_id,
+            )
+        return DataService(app_config.SAVE_FILE)
+
     def run(self) -> None:
         try:
             print("Running application")
+            self._full_run = True
 
-            # 0. Let user choose data input method
-            mode, uploaded = self.ui.render_data_input_selector()
-
-            # 1. If CSV mode and a file is uploaded, read it
-            if mode == "Upload CSV" and uploaded is not None:
-                try:
-                    csv_df = self.data_service.read_portfolio_csv(uploaded)
-                    self._portfolio_df = csv_df
-                    st.success("✅ CSV loaded successfully!")
-                except Exception as e:
-                    self.ui.render_error_message(str(e))
-                    # Fall back to existing data
-
-            # 2. Show editable table (user_df is always the user's last edit)
-            self._portfolio_df = self.ui.render_portfolio_table(self._portfolio_df)
-
-            # 3. If user made changes, update session state
-            # if not edited_df.equals(user_df):
-            st.session_state['portfolio_df'] = self._portfolio_df
-            st.success("✅ Changes saved to session!")
+            # 0-3. Holdings region: input method, CSV upload and the editable table
+            self._render_holdings()
 
             # 4. For calculations and display, create a copy and update prices
-            display_df = self.update_portfolio_prices(self._portfolio_df.copy())
+            display_df = self.update_portfolio_prices(st.session_state['portfolio_df'].copy())
+            self._render_price_freshness()
+            st.session_state['display_df'] = display_df
 
             # 5. Show metrics, charts, etc. using display_df
-            self._display_portfolio_metrics(display_df)
-            self._handle_rebalancing(display_df)
+            self._render_metrics()
+            self._render_rebalancing()
             self.ui.render_footer()
 
         except Exception as e:
             logger.error(f"Application error: {e}")
             self.ui.render_error_message(str(e))
+        finally:
+            self._full_run = False
+
+    # Each region below is a fragment: its widgets rerun only that region instead of the whole page.
+    # Regions share data through session state, since a fragment rerun skips the rest of the script.
+
+    @st.fragment
+    def _render_holdings(self) -> None:
+        """Render the holdings editor, rerunning the whole page when the holdings change."""
+        source_df = self._portfolio_df
+
+        # 0. Let user choose data input method
+        mode, uploaded = self.ui.render_data_input_selector()
+
+        # 1. If CSV mode and a file is uploaded, read it
+        if mode == "Upload CSV" and uploaded is not None:
+            try:
+                source_df = self.data_service.read_portfolio_csv(uploaded)
+                st.success("✅ CSV loaded successfully!")
+            except Exception as e:
+                self.ui.render_error_message(str(e))
+                # Fall back to existing data
+
+        # 2. Show editable table (edited_df is always the user's last edit)
+        edited_df = self.ui.render_portfolio_table(source_df)
+
+        # 3. Update session state, and refresh the other regions if the holdings changed
+        changed = not edited_df.equals(st.session_state.get('portfolio_df'))
+        st.session_state['portfolio_df'] = edited_df
+        if changed:
+            # Results computed for the old holdings no longer apply
+            st.session_state.pop('rebalance_result', None)
+        st.success("✅ Changes saved to session!")
+        if changed and not self._full_run:
+            st.rerun()
+
+    @st.fragment
+    def _render_metrics(self) -> None:
+        """Render the metrics summary for the current holdings."""
+        self._display_portfolio_metrics(st.session_state['display_df'])
+
+    @st.fragment
+    def _render_rebalancing(self) -> None:
+        """Render rebalancing, capital sweep and risk analysis for the current holdings."""
+        self._handle_rebalancing(st.session_state['display_df'])
 
     def update_portfolio_prices(self, df: pd.DataFrame) -> pd.DataFrame:
         """
-        Update current prices for all tickers in the portfolio.
+        Update current prices and quote currencies for all tickers in the portfolio.
+        
+        Never waits on the price provider: tickers without a fresh cached price
+        get their last known price, are recorded in `_stale_prices` and are
+        refreshed in the background.
         """
-        tickers = df["Ticker"].tolist()
-        if not self._price_cache:
-            self._price_cache = self.price_service.get_portfolio_prices(tickers)
-        df["Current Price (per share)"] = df["Ticker"].apply(lambda ticker: self._price_cache.get(ticker, np.nan))
+        tickers = df["Ticker"].dropna().tolist()
+
+        # Detect quote currencies unless the user supplied them
+        detected = df["Ticker"].map(self.fx_service.get_ticker_currencies(tickers))
+        if "Currency" in df.columns:
+            df["Currency"] = df["Currency"].where(df["Currency"].notna() & (df["Currency"] != ""), detected)
+        else:
+            df["Currency"] = detected
+
+        # Prices stored with the portfolio are the last resort for stale tickers
+        stored = {}
+        if "Current Price (per share)" in df.columns:
+            stored = dict(zip(df["Ticker"], pd.to_numeric(df["Current Price (per share)"], errors="coerce")))
+
+        prices, self._fx_rates, self._stale_prices = self.price_warmup.get_prices(
+            tickers, df["Currency"].dropna().unique(), fallback=stored
+        )
+        df["Current Price (per share)"] = df["Ticker"].map(prices).astype(float)
         return df
     
+    def _render_price_freshness(self) -> None:
+        """Flag stale prices and rerun once the background fetch has landed."""
+        if not self._stale_prices:
+            return
+        refreshing = self.price_warmup.is_pending(self._stale_prices)
+        self.ui.render_stale_prices_notice(sorted(self._stale_prices), self.price_warmup.as_of, refreshing)
+        if refreshing:
+            self._await_fresh_prices(tuple(sorted(self._stale_prices)))
+
+    def _prices_refreshing(self) -> bool:
+        """Whether live prices for any stale ticker or FX pair are still being fetched."""
+        return bool(self._stale_prices) and self.price_warmup.is_pending(self._stale_prices)
+
+    def _render_stale_results_notice(self, stale: Set[str]) -> None:
+        """Label results calculated while some prices were last known values."""
+        if stale:
+            self.ui.render_stale_results_notice(sorted(stale), self.price_warmup.as_of)
+
+    @st.fragment(run_every=1)
+    def _await_fresh_prices(self, keys: tuple) -> None:
+        """Poll the background fetch without rerunning the page, then swap in fresh prices."""
+        if not self.price_warmup.is_pending(keys):
+            st.rerun()
+    
     def _process_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         Update prices and calculate metrics.
@@ -123,13 +221,23 @@ class PortfolioRebalancerApp:
             df: Portfolio DataFrame
         """
         # Calculate metrics
-        total_value, total_current_weight, total_target_weight = calculate_portfolio_metrics(df)
+        total_value, total_current_weight, total_target_weight = calculate_portfolio_metrics(df, self._fx_rates)
         
         # Display weight summary
         self.ui.render_weight_summary(df)
         
         # Display total value
-        self.ui.render_total_value(total_value)
+        self.ui.render_total_value(total_value, app_config.BASE_CURRENCY)
+        
+        # Holdings without an FX rate have no value, so say so rather than understate the total
+        if "FX Rate" in df.columns:
+            no_rate = df["FX Rate"].isna()
+            unknown = df["Currency"].isna() | (df["Currency"] == "")
+            missing = df.loc[no_rate & ~unknown, "Currency"].unique().tolist()
+            if missing:
+                self.ui.render_missing_fx_warning(missing, app_config.BASE_CURRENCY)
+            if (no_rate & unknown).any():
+                self.ui.render_unknown_currency_warning(df.loc[no_rate & unknown, "Ticker"].tolist())
     
     def _handle_rebalancing(self, df: pd.DataFrame) -> None:
         """
@@ -139,11 +247,77 @@ class PortfolioRebalancerApp:
             df: Portfolio DataFrame
         """
         # Get additional capital input
-        additional_amount = self.ui.render_additional_capital_input()
+        additional_amount = self.ui.render_additional_capital_input(app_config.BASE_CURRENCY)
+        
+        # Results on prices still being fetched would be superseded moments later; the
+        # page reruns once they land (see _await_fresh_prices), re-enabling the buttons
+        refreshing = self._prices_refreshing()
+        if refreshing:
+            self.ui.render_waiting_for_prices()
         
         # Check if rebalance button is clicked
-        if self.ui.render_rebalance_button():
+        if self.ui.render_rebalance_button(disabled=refreshing):
             self._perform_rebalancing(df, additional_amount)
+        
+        # Results live in session state so that the export controls can rerun without losing them
+        self._display_rebalance_result(additional_amount)
+        
+        with st.expander("📈 How much additional capital do I need?", expanded=False):
+            self._handle_capital_sweep(df)
+        
+        with st.expander("📉 Does the drift matter? (risk analysis)", expanded=False):
+            self._handle_risk_analysis(df)
+    
+    def _handle_capital_sweep(self, df: pd.DataFrame) -> None:
+        """
+        Evaluate a grid of additional capital amounts and display the curve.
+        
+        Args:
+            df: Portfolio DataFrame
+        """
+        max_amount, steps, target_deviation, run_clicked = self.ui.render_capital_sweep_controls(
+            app_config.BASE_CURRENCY, disabled=self._prices_refreshing()
+        )
+        if not run_clicked:
+            return
+        
+        report = validate_portfolio(df)
+        if not report.is_valid:
+            self.ui.render_validation_report(report)
+            return
+        
+        curve = sweep_additional_capital(df, np.linspace(0.0, max_amount, steps))
+        minimum_amount = find_minimum_capital(curve, target_deviation)
+        self.ui.render_capital_sweep_results(curve, minimum_amount, target_deviation, app_config.BASE_CURRENCY)
+        self._render_stale_results_notice(self._stale_prices)
+    
+    def _handle_risk_analysis(self, df: pd.DataFrame) -> None:
+        """
+        Show ex-ante volatility, tracking error against the target weights and risk contributions.
+        
+        Args:
+            df: Portfolio DataFrame with current values calculated
+        """
+        if not self.ui.render_risk_button(disabled=self._prices_refreshing()):
+            return
+        
+        report = validate_portfolio(df)
+        if not report.is_valid:
+            self.ui.render_validation_report(report)
+            return
+        
+        risk_service = get_risk_service(app_config)
+        tickers = df["Ticker"].tolist()
+        with st.spinner("Loading return history..."):
+            risk_service.refresh(tickers)
+        cov = risk_service.covariance(tickers)
+        missing = [ticker for ticker in tickers if ticker not in cov.index]
+        if missing:
+            st.warning(f"⚠️ No return history for {', '.join(missing)}; treated as riskless.")
+        
+        metrics, contributions = calculate_risk_metrics(df, cov)
+        self.ui.render_risk_metrics(metrics, contributions)
+        self._render_stale_results_notice(self._stale_prices)
     
     def _perform_rebalancing(self, df: pd.DataFrame, additional_amount: float) -> None:
         """
@@ -155,10 +329,9 @@ class PortfolioRebalancerApp:
         """
         try:
             # Validate data
-            errors = validate_portfolio_data(df)
-            if errors:
-                for error in errors:
-                    self.ui.render_error_message(error)
+            report = validate_portfolio(df)
+            self.ui.render_validation_report(report)
+            if not report.is_valid:
                 return
             
             # Save current user data to file (only user-editable columns)
@@ -169,29 +342,60 @@ class PortfolioRebalancerApp:
             if "Current Price (per share)" in st.session_state['portfolio_df'].columns:
                 user_data["Current Price (per share)"] = st.session_state['portfolio_df']["Current Price (per share)"]
             
-            self.data_service.save_portfolio_data(user_data)
+            # Only currencies the user set are saved; detected ones are looked up again on load
+            if "Currency" in st.session_state['portfolio_df'].columns:
+                user_data["Currency"] = st.session_state['portfolio_df']["Currency"]
+            
+            try:
+                self.data_service.save_portfolio_data(user_data)
+            except PortfolioConflictError:
+                self.ui.render_save_conflict(self.data_service.account_id)
+                return
             st.success("💾 Portfolio data saved to file!")
             
             # Calculate rebalancing metrics
             rebalanced_df = calculate_rebalancing_metrics(df, additional_amount)
             
-            # Display results
-            self.ui.render_rebalanced_portfolio(rebalanced_df)
-            
-            # Provide download option
-            self.ui.render_download_button(rebalanced_df)
-            
-            # Show suggestion for additional investment
+            # Keep the results for display until the holdings or the amount change
             suggested_amount = self.data_service.get_suggested_additional_amount(
                 rebalanced_df["Target Value"], 
                 df["Current Value"].sum()
             )
-            self.ui.render_suggestion_message(suggested_amount, additional_amount)
+            st.session_state['rebalance_result'] = {
+                # calculate_rebalancing_metrics returns the frame it was given, which is the shared display frame
+                "rebalanced_df": rebalanced_df.copy(),
+                "additional_amount": additional_amount,
+                "suggested_amount": suggested_amount,
+                "stale_prices": set(self._stale_prices),
+            }
             
         except Exception as e:
             logger.error(f"Rebalancing error: {e}")
             self.ui.render_error_message(str(e))
     
+    def _display_rebalance_result(self, additional_amount: float) -> None:
+        """
+        Display the last rebalancing result, if it was computed for the current amount.
+        
+        Args:
+            additional_amount: Additional capital currently entered
+        """
+        result = st.session_state.get('rebalance_result')
+        if result is None or result["additional_amount"] != additional_amount:
+            return
+        
+        rebalanced_df = result["rebalanced_df"]
+        
+        # Display results
+        self.ui.render_rebalanced_portfolio(rebalanced_df, app_config.BASE_CURRENCY)
+        self._render_stale_results_notice(result["stale_prices"])
+        
+        # Provide download option
+        self.ui.render_download_button(rebalanced_df)
+        
+        # Show suggestion for additional investment
+        self.ui.render_suggestion_message(result["suggested_amount"], additional_amount, app_config.BASE_CURRENCY)
+    
     def get_portfolio_summary(self, df: pd.DataFrame) -> dict:
         """
         Get a summary of portfolio metrics.
@@ -202,7 +406,7 @@ class PortfolioRebalancerApp:
         Returns:
             Dictionary with portfolio summary
         """
-        total_value, total_current_weight, total_target_weight = calculate_portfolio_metrics(df)
+        total_value, total_current_weight, total_target_weight = calculate_portfolio_metrics(df, self._fx_rates)
         
         return {
             "total_value": total_value,
@@ -3,7 +3,7 @@ Configuration settings for the portfolio rebalancing application.
 """
 import os
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 
 @dataclass
@@ -13,6 +13,36 @@ class AppConfig:
     # File paths
     SAVE_FILE: str = "data/tornado.json"
     
+    # Storage backend: "json" (single shared SAVE_FILE) or "sqlite" (per-account DATABASE_FILE)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "json")
+    DATABASE_FILE: str = os.getenv("DATABASE_FILE", "data/portfolios.db")
+    DEFAULT_ACCOUNT: str = "default"
+    
+    # Price provider: "yahoo" (live), "record" (live, saved to PRICE_CASSETTE) or "replay" (offline)
+    PRICE_PROVIDER: str = os.getenv("PRICE_PROVIDER", "yahoo")
+    PRICE_CASSETTE: str = os.getenv("PRICE_CASSETTE", "data/price_cassette.json.gz")
+    REPLAY_LATENCY_MS: float = float(os.getenv("REPLAY_LATENCY_MS", "0"))
+    REPLAY_JITTER_MS: float = float(os.getenv("REPLAY_JITTER_MS", "0"))
+    REPLAY_ERROR_RATE: float = float(os.getenv("REPLAY_ERROR_RATE", "0"))
+    REPLAY_SEED: Optional[int] = int(os.environ["REPLAY_SEED"]) if os.getenv("REPLAY_SEED") else None
+    
+    # HTTP rebalancing API
+    API_HOST: str = os.getenv("API_HOST", "127.0.0.1")
+    API_PORT: int = int(os.getenv("API_PORT", "8000"))
+    API_WORKERS: int = int(os.getenv("API_WORKERS", "8"))
+    PRICE_CACHE_TTL: float = float(os.getenv("PRICE_CACHE_TTL", "300"))
+    
+    # Background price warm-up; last known prices are kept in PRICE_SNAPSHOT_FILE
+    PRICE_SNAPSHOT_FILE: str = os.getenv("PRICE_SNAPSHOT_FILE", "data/price_snapshot.json")
+    PRICE_WARMUP_WORKERS: int = int(os.getenv("PRICE_WARMUP_WORKERS", "8"))
+    
+    # Risk analytics: history downloaded per new ticker and returns covered by the covariance
+    RISK_HISTORY_PERIOD: str = os.getenv("RISK_HISTORY_PERIOD", "1y")
+    RISK_LOOKBACK_DAYS: int = int(os.getenv("RISK_LOOKBACK_DAYS", "252"))
+    
+    # Currency all holdings are converted into for metrics and rebalancing
+    BASE_CURRENCY: str = "INR"
+    
     # Default portfolio data
     DEFAULT_TICKERS: List[str] = None
     DEFAULT_SHARES: List[int] = None
@@ -0,0 +1 @@
+# Jobs package for portfolio rebalancing application 
\ No newline at end of file
@@ -0,0 +1,320 @@
+"""
+Parallel, resumable bulk rebalancing for directories of per-account portfolio CSVs.
+
+Each input file follows the `DataService.read_portfolio_csv` schema and is named
+after its account (e.g. `ACC001.csv`). Run with:
+
+    python -m jobs.bulk_runner input_dir output_dir --workers 8
+
+The ticker universe is de-duplicated across all files and priced once, then
+accounts are rebalanced on a process pool. Progress is checkpointed to
+`output_dir/checkpoint.json`; rerunning the same command with `--resume` resumes
+a crashed run. Accounts whose input file changed since are rebalanced again, and
+the checkpoint is discarded if files were added or removed or its prices expired.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional
+
+from services.data_service import DataService
+from services.export_service import EXPORT_FORMATS, export_service
+from services.fx_service import FxService
+from services.price_service import PriceService
+from utils.portfolio_utils import calculate_portfolio_metrics, calculate_rebalancing_metrics
+from utils.validation import FAIL_FAST, validate_portfolio
+from config.settings import app_config
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_FILE = "checkpoint.json"
+SUMMARY_FILE = "summary.csv"
+COMBINED_STEM = "combined"
+
+
+def discover_portfolio_files(input_dir: str) -> Dict[str, str]:
+    """
+    Find portfolio CSVs in a directory.
+
+    Returns:
+        Mapping of account id (file stem) -> file path, sorted by account
+    """
+    paths = sorted(glob.glob(os.path.join(input_dir, "*.csv")))
+    return {os.path.splitext(os.path.basename(path))[0]: path for path in paths}
+
+
+def _fingerprint(path: str) -> List[int]:
+    """Size and modification time of an input file, to detect edits between runs."""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _read_tickers(path: str) -> List[str]:
+    """Read only the ticker column of a portfolio CSV."""
+    try:
+        return pd.read_csv(path, usecols=["Ticker"])["Ticker"].astype(str).str.strip().tolist()
+    except Exception as e:
+        logger.error(f"Could not read tickers from {path}: {e}")
+        return []
+
+
+def rebalance_account(account_id: str, path: str, output_dir: str, prices: Dict[str, float],
+                      currencies: Dict[str, Optional[str]], fx_rates: Dict[str, float],
+                      additional_capital: float) -> Dict[str, Any]:
+    """
+    Rebalance one account file and write its output CSV.
+
+    Runs inside a worker process, so it only uses the prices and quote
+    currencies it is given; a Currency column in the file takes precedence.
+
+    Returns:
+        Summary row for the account
+    """
+    summary: Dict[str, Any] = {"Account": account_id, "Status": "ok", "Error": ""}
+    output_path = os.path.join(output_dir, f"{account_id}_rebalanced.csv")
+    try:
+        df = DataService(app_config.SAVE_FILE).read_portfolio_csv(path)
+        df["Current Price (per share)"] = df["Ticker"].map(prices).astype(float)
+        detected = df["Ticker"].map(currencies)
+        if "Currency" in df.columns:
+            df["Currency"] = df["Currency"].where(df["Currency"].notna() & (df["Currency"] != ""), detected)
+        else:
+            df["Currency"] = detected
+        total_value, _, total_target_weight = calculate_portfolio_metrics(df, fx_rates)
+        summary.update({
+            "Holdings": len(df),
+            "Unpriced": int(df["Current Price (per share)"].isna().sum()),
+        })
+
+        # Validated once priced, so unpriced holdings and missing FX rates fail the account
+        # instead of being sold off as if they were worth nothing
+        report = validate_portfolio(df, mode=FAIL_FAST)
+        if not report.is_valid:
+            raise ValueError("; ".join(report.messages("error")))
+
+        rebalanced_df = calculate_rebalancing_metrics(df, additional_capital)
+
+        tmp_path = output_path + ".tmp"
+        rebalanced_df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, output_path)
+
+        summary.update({
+            "Total Value": round(float(total_value), 2),
+            "Total Target Weight (%)": float(total_target_weight),
+            "Trades": int((rebalanced_df["Shares to Buy/Sell"] != 0).sum()),
+            "Buy Value": round(float(rebalanced_df["Difference"].clip(lower=0).sum()), 2),
+            "Sell Value": round(float(-rebalanced_df["Difference"].clip(upper=0).sum()), 2),
+        })
+    except Exception as e:
+        summary.update({"Status": "failed", "Error": str(e)})
+        # Trades left over from an earlier run must not be picked up for a failed account
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    return summary
+
+
+class BulkRunner:
+    """Runs rebalancing over a directory of account CSVs with checkpointing."""
+
+    def __init__(self, input_dir: str, output_dir: str, workers: Optional[int] = None,
+                 additional_capital: float = 0.0, price_service: Optional[PriceService] = None,
+                 fx_service: Optional[FxService] = None, price_fetch_workers: int = 16,
+                 checkpoint_every: int = 25, resume: bool = False, max_price_age: float = 3600.0):
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.additional_capital = additional_capital
+        self.price_service = price_service or PriceService()
+        self.fx_service = fx_service or FxService(app_config.BASE_CURRENCY)
+        self.price_fetch_workers = price_fetch_workers
+        self.checkpoint_every = checkpoint_every
+        self.resume = resume
+        self.max_price_age = max_price_age
+        self.checkpoint_path = os.path.join(output_dir, CHECKPOINT_FILE)
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _load_checkpoint(self, inputs: Dict[str, List[int]]) -> Dict[str, Any]:
+        """
+        Load the checkpoint of an earlier run of the same inputs, or start a new one.
+
+        Args:
+            inputs: Mapping of account id -> fingerprint of its input file
+
+        Returns:
+            Checkpoint whose completed accounts are all still up to date
+        """
+        fresh = {"inputs": inputs, "priced_at": None, "prices": {}, "currencies": {}, "fx_rates": {}, "completed": {}}
+        if not self.resume or not os.path.exists(self.checkpoint_path):
+            return fresh
+        try:
+            with open(self.checkpoint_path, "r") as f:
+                checkpoint = json.load(f)
+        except Exception as e:
+            logger.error(f"Ignoring unreadable checkpoint {self.checkpoint_path}: {e}")
+            return fresh
+
+        # Results are only comparable across accounts if they were all priced together
+        previous = checkpoint.get("inputs", {})
+        priced_at = checkpoint.get("priced_at")
+        if set(previous) != set(inputs):
+            logger.warning("Input files were added or removed since the checkpoint; starting over")
+            return fresh
+        if priced_at is None or time.time() - priced_at > self.max_price_age:
+            logger.warning(f"Checkpointed prices are older than {self.max_price_age:.0f}s; starting over")
+            return fresh
+
+        changed = [account for account, fingerprint in inputs.items() if previous[account] != fingerprint]
+        for account in changed:
+            checkpoint["completed"].pop(account, None)
+        if changed:
+            logger.warning(f"{len(changed)} input files changed since the checkpoint and will be rebalanced again")
+        checkpoint["inputs"] = inputs
+        logger.info(f"Resuming from checkpoint with {len(checkpoint['completed'])} completed accounts")
+        return checkpoint
+
+    def _save_checkpoint(self, checkpoint: Dict[str, Any]) -> None:
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _price_universe(self, files: Dict[str, str], checkpoint: Dict[str, Any],
+                        pool: ProcessPoolExecutor) -> Dict[str, List[str]]:
+        """
+        Price every distinct ticker across all files once, reusing checkpointed prices.
+
+        Returns:
+            Mapping of account id -> tickers held
+        """
+        account_tickers = dict(zip(files, pool.map(_read_tickers, files.values(), chunksize=16)))
+        universe = set().union(*account_tickers.values())
+
+        prices = checkpoint["prices"]
+        missing = sorted(universe - set(prices))
+        logger.info(f"Ticker universe: {len(universe)} distinct, {len(missing)} to price")
+        if missing:
+            prices.update(self.price_service.get_portfolio_prices(missing, max_workers=self.price_fetch_workers))
+            if checkpoint["priced_at"] is None:
+                checkpoint["priced_at"] = time.time()
+
+        # Currencies are resolved after pricing, so they come from the provider where it reported one.
+        # FX rates are kept alongside the prices under their pair tickers.
+        currencies = checkpoint.setdefault("currencies", {})
+        currencies.update(self.fx_service.get_ticker_currencies(sorted(universe - set(currencies))))
+        checkpoint["fx_rates"] = self.fx_service.get_fx_rates(set(currencies.values()), prices)
+        self._save_checkpoint(checkpoint)
+        return account_tickers
+
+    def run(self) -> pd.DataFrame:
+        """
+        Rebalance every account not already completed.
+
+        Returns:
+            Summary DataFrame with one row per account
+        """
+        started = time.perf_counter()
+        files = discover_portfolio_files(self.input_dir)
+        checkpoint = self._load_checkpoint({account: _fingerprint(path) for account, path in files.items()})
+        completed = checkpoint["completed"]
+        pending = {
+            account: path for account, path in files.items()
+            if account not in completed
+            or not os.path.exists(os.path.join(self.output_dir, f"{account}_rebalanced.csv"))
+        }
+        logger.info(f"Found {len(files)} accounts, {len(pending)} pending")
+
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            account_tickers = self._price_universe(files, checkpoint, pool)
+            prices, currencies, fx_rates = checkpoint["prices"], checkpoint["currencies"], checkpoint["fx_rates"]
+
+            futures = []
+            for account, path in pending.items():
+                account_prices = {t: prices[t] for t in account_tickers[account] if t in prices}
+                account_currencies = {t: currencies.get(t) for t in account_tickers[account]}
+                futures.append(pool.submit(
+                    rebalance_account, account, path, self.output_dir,
+                    account_prices, account_currencies, fx_rates, self.additional_capital,
+                ))
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                summary = future.result()
+                completed[summary["Account"]] = summary
+                if done % self.checkpoint_every == 0:
+                    self._save_checkpoint(checkpoint)
+            self._save_checkpoint(checkpoint)
+
+        summary_df = pd.DataFrame([completed[account] for account in files if account in completed])
+        summary_df.to_csv(os.path.join(self.output_dir, SUMMARY_FILE), index=False)
+        failed = int((summary_df["Status"] != "ok").sum()) if not summary_df.empty else 0
+        logger.info(
+            f"Rebalanced {len(pending)} accounts ({failed} failed overall) "
+            f"in {time.perf_counter() - started:.2f}s with {self.workers} workers"
+        )
+        return summary_df
+
+    def _iter_account_outputs(self, accounts: List[str]) -> Iterator[pd.DataFrame]:
+        """Lazily read per-account outputs, tagging each row with its account."""
+        for account in accounts:
+            path = os.path.join(self.output_dir, f"{account}_rebalanced.csv")
+            if os.path.exists(path):
+                df = pd.read_csv(path)
+                df.insert(0, "Account", account)
+                yield df
+
+    def write_combined(self, fmt: str = "csv") -> str:
+        """
+        Stream every account's output into one combined file, one account at a time.
+
+        Args:
+            fmt: One of 'csv', 'parquet' or 'xlsx'
+
+        Returns:
+            Path of the combined file
+        """
+        accounts = list(discover_portfolio_files(self.input_dir))
+        path = os.path.join(self.output_dir, export_service.file_name(COMBINED_STEM, fmt))
+        export_service.stream_export(self._iter_account_outputs(accounts), fmt, path)
+        logger.info(f"Wrote combined results to {path}")
+        return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Rebalance a directory of per-account portfolio CSVs.")
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (default: all cores)")
+    parser.add_argument("--additional-capital", type=float, default=0.0)
+    parser.add_argument("--price-fetch-workers", type=int, default=16)
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume from the checkpoint in output_dir instead of starting over")
+    parser.add_argument("--max-price-age", type=float, default=3600.0,
+                        help="Seconds checkpointed prices stay valid for --resume")
+    parser.add_argument("--combined", choices=list(EXPORT_FORMATS),
+                        help="Also stream all account outputs into one combined file of this format")
+    args = parser.parse_args()
+
+    runner = BulkRunner(
+        args.input_dir,
+        args.output_dir,
+        workers=args.workers,
+        additional_capital=args.additional_capital,
+        price_fetch_workers=args.price_fetch_workers,
+        resume=args.resume,
+        max_price_age=args.max_price_age,
+    )
+    runner.run()
+    if args.combined:
+        runner.write_combined(args.combined)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
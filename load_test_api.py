@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Load test for the rebalancing HTTP API.
+
+By default starts an in-process server backed by deterministic offline prices,
+so it runs with no outside services:
+
+    python load_test_api.py --requests 2000 --concurrency 32
+
+Point it at a running server instead with --url http://127.0.0.1:8000, or
+replay a recorded price cassette (see PRICE_PROVIDER=record) with
+--cassette data/price_cassette.json.gz --latency-ms 50 --error-rate 0.01.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from api.server import RebalancingAPI, create_server
+from services.fx_service import FxService, StaticFxProvider
+from services.price_providers import PriceProvider, ReplayPriceProvider
+from services.price_service import PriceService
+
+TICKERS = [f"SYM{i:03d}.NS" for i in range(200)] + ["VOO", "QQQ", "GLD"]
+
+
+class OfflinePriceProvider(PriceProvider):
+    """Provider returning a deterministic daily close per ticker without network access."""
+
+    def history(self, ticker: str, period: str = "1d") -> pd.DataFrame:
+        close = round(50 + (sum(map(ord, ticker)) * 37) % 4000 + 0.25, 2)
+        return pd.DataFrame({"Close": [close]}, index=pd.DatetimeIndex([pd.Timestamp("2024-06-28")], name="Date"))
+
+
+def make_portfolio(rng: random.Random, size: int) -> dict:
+    tickers = rng.sample(TICKERS, size)
+    weights = np.array([rng.random() for _ in tickers])
+    weights = (weights / weights.sum() * 100).round(2)
+    return {
+        "holdings": [
+            {"Ticker": t, "Shares Held": rng.randint(0, 500), "Target Weight (%)": float(w)}
+            for t, w in zip(tickers, weights)
+        ],
+        "additional_capital": rng.choice([0, 10000, 50000]),
+    }
+
+
+def make_request(base_url: str, rng: random.Random, holdings: int, batch_size: int) -> urllib.request.Request:
+    kind = rng.random()
+    if kind < 0.2:
+        tickers = ",".join(rng.sample(TICKERS, holdings))
+        return urllib.request.Request(f"{base_url}/prices?tickers={tickers}")
+    if kind < 0.4:
+        path, body = "/metrics", make_portfolio(rng, holdings)
+    elif kind < 0.9:
+        path, body = "/rebalance", make_portfolio(rng, holdings)
+    else:
+        path = "/rebalance/batch"
+        body = {"portfolios": [dict(make_portfolio(rng, holdings), id=i) for i in range(batch_size)]}
+    return urllib.request.Request(
+        f"{base_url}{path}",
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+
+
+def run(base_url: str, total: int, concurrency: int, holdings: int, batch_size: int, seed: int) -> None:
+    rng = random.Random(seed)
+    requests = [make_request(base_url, rng, holdings, batch_size) for _ in range(total)]
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def send(request: urllib.request.Request) -> None:
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+            ok = True
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            errors += 0 if ok else 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, requests))
+    wall = time.perf_counter() - started
+
+    ms = np.array(latencies) * 1000
+    print(f"Requests:    {total} ({errors} errors), concurrency {concurrency}")
+    print(f"Latency p50: {np.percentile(ms, 50):.1f} ms")
+    print(f"Latency p99: {np.percentile(ms, 99):.1f} ms")
+    print(f"Throughput:  {total / wall:.1f} req/s over {wall:.2f} s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the rebalancing API.")
+    parser.add_argument("--url", help="Base URL of a running server; omit to start an offline one in-process")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=8, help="Worker pool size of the in-process server")
+    parser.add_argument("--holdings", type=int, default=20, help="Holdings per portfolio")
+    parser.add_argument("--batch-size", type=int, default=25, help="Portfolios per batch request")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--cassette", help="Serve prices from a recorded cassette instead of synthetic ones")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Replay latency per price call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Replay error probability per price call")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        if args.cassette:
+            price_service = PriceService(ReplayPriceProvider(
+                args.cassette, latency_ms=args.latency_ms, error_rate=args.error_rate, seed=args.seed,
+            ))
+        else:
+            price_service = PriceService(OfflinePriceProvider())
+        api = RebalancingAPI(
+            price_service=price_service,
+            fx_service=FxService("INR", StaticFxProvider({"USD": 83.0})),
+        )
+        server = create_server("127.0.0.1", 0, args.workers, api)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        run(base_url.rstrip("/"), args.requests, args.concurrency, args.holdings, args.batch_size, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Concurrent-session load test for the Streamlit app.
+
+Simulates N users at once, each driving its own headless session of main.py
+through Streamlit's AppTest: switching to a private account, uploading a
+holdings CSV, editing the additional capital and rebalancing. Prices are
+served by the replay provider from a synthetic cassette, so no network is used,
+and portfolios are stored in a temporary SQLite database.
+
+    python load_test_app.py --sessions 16 --iterations 5 --price-latency-ms 100
+
+Reports rerun latency percentiles per step, throughput and memory per session.
+
+AppTest swaps a process-wide mock runtime on every run, so each simulated
+session runs in its own worker process. Unlike a real Streamlit server, where
+all sessions share one process and its GIL, the sessions never contend for the
+interpreter and each has its own caches, so the figures are an upper bound on
+what one server process sustains. Use --cpus to pin all workers to as many
+cores as the target container has. The holdings table itself
+(st.data_editor) cannot be driven by AppTest, so holdings changes are
+simulated through CSV uploads. The rebalance step includes any wait for live
+prices, since the button is disabled until they arrive.
+"""
+import argparse
+import multiprocessing as mp
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MAIN_SCRIPT = os.path.join(ROOT, "main.py")
+
+UNIVERSE = [f"SYM{i:03d}.NS" for i in range(300)] + ["TCS.NS", "INFY.NS", "HDFC.NS", "VOO", "QQQ"]
+FX_PAIRS = ["USDINR=X"]
+STEPS = ["initial load", "switch account", "choose upload", "upload csv", "edit capital", "rebalance"]
+
+
+def write_synthetic_cassette(path: str, seed: int) -> None:
+    """Write a replay cassette with deterministic prices for every ticker the sessions use."""
+    from services.price_providers import Cassette
+
+    rng = np.random.default_rng(seed)
+    cassette = Cassette(path)
+    for ticker in UNIVERSE:
+        cassette.record(ticker, "1d", pd.Series([round(rng.uniform(20, 5000), 2)], index=pd.to_datetime(["2024-06-28"])))
+    for pair in FX_PAIRS:
+        dates = pd.date_range("2024-06-24", periods=5)
+        cassette.record(pair, "5d", pd.Series(83.0 + rng.normal(0, 0.1, len(dates)), index=dates))
+    cassette.save()
+
+
+def make_holdings_csv(rng: random.Random, holdings: int) -> bytes:
+    tickers = rng.sample(UNIVERSE, holdings)
+    weights = np.array([rng.random() for _ in tickers])
+    weights = (weights / weights.sum() * 100).round(2)
+    weights[-1] = round(100 - weights[:-1].sum(), 2)
+    df = pd.DataFrame({
+        "Ticker": tickers,
+        "Shares Held": [rng.randint(0, 300) for _ in tickers],
+        "Target Weight (%)": weights,
+    })
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def _by_label(widgets, text: str):
+    for widget in widgets:
+        if text in widget.label:
+            return widget
+    raise LookupError(f"No widget labelled '{text}'")
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def run_session(index: int, args: argparse.Namespace, env: Dict[str, str], cpus: List[int],
+                start_barrier) -> Dict[str, Any]:
+    """Drive one headless session through a realistic sequence of interactions."""
+    # Must be set before the app's config module is first imported
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+
+    from streamlit.testing.v1 import AppTest
+
+    # Warm up imports so they count against neither latency nor memory
+    AppTest.from_file(MAIN_SCRIPT, default_timeout=args.timeout).run()
+    baseline_mb = _rss_mb()
+
+    rng = random.Random(args.seed + index)
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: List[str] = []
+    at = AppTest.from_file(MAIN_SCRIPT, default_timeout=args.timeout)
+
+    def step(name: str, action) -> None:
+        started = time.perf_counter()
+        try:
+            action()
+            if at.exception:
+                errors.append(f"{name}: {at.exception[0].value}")
+            # The app reports its own failures (validation, pricing, saving) through st.error
+            elif at.error:
+                errors.append(f"{name}: {at.error[0].value}")
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+        latencies[name].append(time.perf_counter() - started)
+
+    def rebalance() -> None:
+        # The button stays disabled until live prices for new holdings land, as a user would wait
+        deadline = time.perf_counter() + args.timeout
+        while _by_label(at.button, "Rebalance").disabled and time.perf_counter() < deadline:
+            time.sleep(0.1)
+            at.run()
+        _by_label(at.button, "Rebalance").click().run()
+
+    start_barrier.wait()
+    started = time.perf_counter()
+    step("initial load", lambda: at.run())
+    step("switch account", lambda: _by_label(at.sidebar.text_input, "Account").set_value(f"loadtest-{index}").run())
+    step("choose upload", lambda: _by_label(at.radio, "portfolio data").set_value("Upload CSV").run())
+    step("upload csv", lambda: at.file_uploader[0].set_value(
+        (f"portfolio_{index}.csv", make_holdings_csv(rng, args.holdings), "text/csv")
+    ).run())
+    for _ in range(args.iterations):
+        time.sleep(rng.uniform(0, args.think_time))
+        step("edit capital", lambda: _by_label(at.number_input, "additional amount").set_value(
+            rng.choice([0, 5000, 25000, 100000])
+        ).run())
+        step("rebalance", rebalance)
+
+    return {
+        "latencies": dict(latencies),
+        "errors": errors,
+        "memory_mb": _rss_mb() - baseline_mb,
+        "started": started,
+        "finished": time.perf_counter(),
+    }
+
+
+def report(results: List[Dict[str, Any]]) -> None:
+    all_latencies = []
+    print(f"{'Step':<16}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name in STEPS:
+        ms = np.array([v for r in results for v in r["latencies"].get(name, [])]) * 1000
+        if len(ms) == 0:
+            continue
+        all_latencies.extend(ms)
+        print(f"{name:<16}{len(ms):>7}{np.percentile(ms, 50):>10.1f}{np.percentile(ms, 90):>10.1f}"
+              f"{np.percentile(ms, 99):>10.1f}{ms.max():>10.1f}")
+    ms = np.array(all_latencies)
+    print(f"{'all reruns':<16}{len(ms):>7}{np.percentile(ms, 50):>10.1f}{np.percentile(ms, 90):>10.1f}"
+          f"{np.percentile(ms, 99):>10.1f}{ms.max():>10.1f}")
+
+    # perf_counter is system-wide on Linux and macOS, so timestamps compare across processes
+    wall = max(r["finished"] for r in results) - min(r["started"] for r in results)
+    memory = np.array([r["memory_mb"] for r in results])
+    errors = [e for r in results for e in r["errors"]]
+    print(f"\nSessions:    {len(results)} concurrent, one process each")
+    print(f"Throughput:  {len(ms) / wall:.1f} reruns/s over {wall:.2f} s")
+    print(f"Memory:      {memory.mean():.1f} MB per session (max {memory.max():.1f} MB)")
+    print(f"Errors:      {len(errors)}")
+    for error in errors[:10]:
+        print(f"  - {error}")
+    print("\nNote: each session ran in its own process, with its own GIL and caches. A Streamlit server\n"
+          "runs all sessions in one process, so treat these figures as an upper bound on its capacity.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the Streamlit app with concurrent headless sessions.")
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=3, help="Edit + rebalance cycles per session")
+    parser.add_argument("--holdings", type=int, default=25, help="Holdings per uploaded portfolio")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Max random pause between cycles (s)")
+    parser.add_argument("--price-latency-ms", type=float, default=0.0, help="Simulated latency per price call")
+    parser.add_argument("--price-error-rate", type=float, default=0.0, help="Simulated price error probability")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-rerun timeout (s)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--cpus", type=int, default=None, help="Pin sessions to this many cores (Linux)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="rebalancer-loadtest-")
+    cassette = os.path.join(workdir, "prices.json.gz")
+    sys.path.insert(0, ROOT)
+    write_synthetic_cassette(cassette, args.seed)
+    env = {
+        "PRICE_PROVIDER": "replay",
+        "PRICE_CASSETTE": cassette,
+        "REPLAY_LATENCY_MS": str(args.price_latency_ms),
+        "REPLAY_ERROR_RATE": str(args.price_error_rate),
+        "REPLAY_SEED": str(args.seed),
+        "STORAGE_BACKEND": "sqlite",
+        "DATABASE_FILE": os.path.join(workdir, "portfolios.db"),
+        "PRICE_SNAPSHOT_FILE": os.path.join(workdir, "price_snapshot.json"),
+    }
+    cpus = list(range(args.cpus)) if args.cpus else []
+
+    ctx = mp.get_context("spawn")
+    with ctx.Manager() as manager:
+        barrier = manager.Barrier(args.sessions)
+        with ctx.Pool(processes=args.sessions) as pool:
+            pending = [
+                pool.apply_async(run_session, (i, args, env, cpus, barrier))
+                for i in range(args.sessions)
+            ]
+            results = [p.get() for p in pending]
+
+    report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,14 +8,31 @@ actionable recommendations for buying/selling shares.
 
 import logging
 from app.portfolio_app import PortfolioRebalancerApp
+from config.settings import app_config
+from services.data_service import DataService
+from services.portfolio_store import get_portfolio_store
+from services.price_warmup import get_price_warmup
 
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+def start_price_warmup():
+    """
+    Start fetching prices for the saved portfolio in the background.
+
+    Streamlit runs this script on every session run, so only the first call in a
+    process starts the fetch; later calls return immediately.
+    """
+    store = get_portfolio_store(app_config.DATABASE_FILE) if app_config.STORAGE_BACKEND == "sqlite" else None
+    data_service = DataService(app_config.SAVE_FILE, store=store, account_id=app_config.DEFAULT_ACCOUNT)
+    get_price_warmup(app_config).warm_start(data_service.load_portfolio_data)
+
 def main():
     try:
+        start_price_warmup()
+        
         # Create and run the application
         app = PortfolioRebalancerApp()
         app.run()
@@ -6,7 +6,10 @@ import os
 import pandas as pd
 import numpy as np
 import logging
-from typing import Union, IO
+from typing import Optional, Union, IO
+
+from services.export_service import export_service
+from services.portfolio_store import PortfolioConflictError, SQLitePortfolioStore
 
 logger = logging.getLogger(__name__)
 
@@ -14,9 +17,20 @@ logger = logging.getLogger(__name__)
 class DataService:
     """Service for managing portfolio data persistence."""
     
-    def __init__(self, save_file: str = "data/tornado.json"):
-
+    def __init__(self, save_file: str = "data/tornado.json",
+                 store: Optional[SQLitePortfolioStore] = None,
+                 account_id: str = "default"):
+        """
+        Args:
+            save_file: JSON file used when no store is given
+            store: Optional multi-account store; takes precedence over `save_file`
+            account_id: Account whose portfolio is loaded and saved in the store
+        """
         self.save_file = save_file
+        self.store = store
+        self.account_id = account_id
+        # Store version of the last loaded or saved portfolio, checked on the next save
+        self.version: Optional[int] = None
         self._ensure_data_directory()
     
     def _ensure_data_directory(self) -> None:
@@ -32,11 +46,25 @@ class DataService:
         Returns:
             DataFrame with portfolio data
         """
+        if self.store is not None:
+            try:
+                df, self.version = self.store.load_portfolio(self.account_id)
+            except Exception as e:
+                logger.error(f"Error loading portfolio data: {e}")
+                return self._get_default_data()
+            if not df.empty:
+                logger.info(f"Loaded portfolio data for account {self.account_id}")
+                return df
+            logger.info(f"No saved data for account {self.account_id}, using default portfolio")
+            return self._get_default_data()
+
         if os.path.exists(self.save_file):
             try:
                 with open(self.save_file, "r") as f:
                     data = json.load(f)
                 df = pd.DataFrame(data)
+                if "Currency" not in df.columns:
+                    df["Currency"] = None
                 logger.info(f"Loaded portfolio data from {self.save_file}")
                 return df
             except Exception as e:
@@ -50,9 +78,26 @@ class DataService:
         """
         Save portfolio data to file.
         
+        With a store, the save is rejected if another session saved the
+        account after this service loaded it.
+        
         Args:
             df: DataFrame to save
+            
+        Raises:
+            PortfolioConflictError: If the stored portfolio changed since it was loaded
         """
+        if self.store is not None:
+            try:
+                self.version = self.store.save_portfolio(self.account_id, df, expected_version=self.version)
+            except PortfolioConflictError as e:
+                logger.warning(f"Save conflict: {e}")
+                raise
+            except Exception as e:
+                logger.error(f"Error saving portfolio data: {e}")
+                raise
+            return
+
         try:
             with open(self.save_file, "w") as f:
                 json.dump(df.to_dict(orient="list"), f, indent=2)
@@ -72,31 +117,37 @@ class DataService:
             "Ticker": ["TCS.NS", "INFY.NS", "HDFC.NS"],
             "Shares Held": [10, 20, 12],
             "Target Weight (%)": [25.0, 50.0, 25.0],
-            "Current Price (per share)": [np.nan, np.nan, np.nan]
+            "Current Price (per share)": [np.nan, np.nan, np.nan],
+            "Currency": [None, None, None]
         }
         return pd.DataFrame(data)
     
-    def export_to_csv(self, df: pd.DataFrame, filename: str = "rebalanced_portfolio.csv") -> bytes:
+    def export_to_csv(self, df: pd.DataFrame, filename: Optional[str] = None) -> bytes:
         """
         Export DataFrame to CSV format.
         
         Args:
             df: DataFrame to export
-            filename: Name of the CSV file
+            filename: Optional path to also write the CSV to
             
         Returns:
             CSV data as bytes
         """
-        return df.to_csv(index=False).encode('utf-8')
+        payload = export_service.export(df, "csv")
+        if filename:
+            with open(filename, "wb") as f:
+                f.write(payload)
+            logger.info(f"Exported {len(df)} rows to {filename}")
+        return payload
 
     def _validate_csv_columns(self, df: pd.DataFrame) -> None:
         """Validate that CSV has exactly the expected columns in the expected order."""
         expected_columns = ["Ticker", "Shares Held", "Target Weight (%)"]
         incoming_columns = [col.strip() for col in df.columns.tolist()]
-        if incoming_columns != expected_columns:
+        if incoming_columns not in (expected_columns, expected_columns + ["Currency"]):
             raise ValueError(
                 "CSV schema mismatch. Expected columns exactly: "
-                f"{expected_columns} but got {incoming_columns}."
+                f"{expected_columns} (optionally followed by 'Currency') but got {incoming_columns}."
             )
 
     def read_portfolio_csv(self, input_source: Union[str, IO[str], IO[bytes]]) -> pd.DataFrame:
@@ -104,7 +155,8 @@ class DataService:
         Read a portfolio CSV and validate it matches the export schema exactly.
 
         The CSV must contain exactly these columns in this order:
-        ["Ticker", "Shares Held", "Target Weight (%)"].
+        ["Ticker", "Shares Held", "Target Weight (%)"], optionally followed by
+        "Currency" to set quote currencies that cannot be detected.
         """
         try:
             df = pd.read_csv(input_source)
@@ -114,11 +166,17 @@ class DataService:
         
         # Validate schema strictly
         self._validate_csv_columns(df)
+        df.columns = [col.strip() for col in df.columns]
 
         # Coerce types and clean values
         df["Ticker"] = df["Ticker"].astype(str).str.strip()
         df["Shares Held"] = pd.to_numeric(df["Shares Held"], errors="raise").astype(int)
         df["Target Weight (%)"] = pd.to_numeric(df["Target Weight (%)"], errors="raise").astype(float)
+        if "Currency" not in df.columns:
+            df["Currency"] = None
+        else:
+            # Blank cells leave the currency to be detected
+            df["Currency"] = df["Currency"].map(lambda c: str(c).strip() if pd.notna(c) and str(c).strip() else None)
 
         logger.info(f"Successfully loaded portfolio CSV with {len(df)} rows")
         return df
@@ -0,0 +1,198 @@
+"""
+Export service for serializing portfolio results to CSV, Parquet and Excel.
+"""
+import hashlib
+import io
+import logging
+import threading
+import pandas as pd
+from collections import OrderedDict
+from typing import IO, Iterable, Iterator, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+# Format -> (MIME type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", ".xlsx"),
+}
+
+
+def content_hash(df: pd.DataFrame) -> str:
+    """
+    Hash a DataFrame's columns and values.
+
+    Args:
+        df: DataFrame to hash
+
+    Returns:
+        Hex digest that changes whenever the content changes
+    """
+    digest = hashlib.sha256()
+    digest.update("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def format_for_filename(filename: str) -> str:
+    """Infer the export format from a file name's extension."""
+    for fmt, (_, extension) in EXPORT_FORMATS.items():
+        if filename.lower().endswith(extension):
+            return fmt
+    raise ValueError(f"Unsupported export file type: {filename}. Use one of {list(EXPORT_FORMATS)}")
+
+
+class ExportService:
+    """Builds export payloads on demand and caches them by content hash."""
+
+    def __init__(self, max_cached_payloads: int = 32, chunk_rows: int = 50_000):
+        self.max_cached_payloads = max_cached_payloads
+        self.chunk_rows = chunk_rows
+        self._cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def mime_type(fmt: str) -> str:
+        return EXPORT_FORMATS[fmt][0]
+
+    @staticmethod
+    def file_name(stem: str, fmt: str) -> str:
+        return stem + EXPORT_FORMATS[fmt][1]
+
+    def export(self, df: pd.DataFrame, fmt: str = "csv") -> bytes:
+        """
+        Serialize a DataFrame, reusing the payload if this content was exported before.
+
+        Args:
+            df: DataFrame to export
+            fmt: One of 'csv', 'parquet' or 'xlsx'
+
+        Returns:
+            Serialized payload
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}. Use one of {list(EXPORT_FORMATS)}")
+
+        key = (content_hash(df), fmt)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        buffer = io.BytesIO()
+        self.stream_export([df], fmt, buffer)
+        payload = buffer.getvalue()
+        logger.info(f"Built {fmt} export of {len(df)} rows ({len(payload)} bytes)")
+
+        with self._lock:
+            self._cache[key] = payload
+            while len(self._cache) > self.max_cached_payloads:
+                self._cache.popitem(last=False)
+        return payload
+
+    def _chunks(self, frames: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Split frames into pieces of at most `chunk_rows` rows."""
+        for frame in frames:
+            for start in range(0, max(len(frame), 1), self.chunk_rows):
+                yield frame.iloc[start:start + self.chunk_rows]
+
+    def iter_csv(self, frames: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+        """
+        Yield CSV bytes chunk by chunk, writing the header only once.
+
+        Args:
+            frames: DataFrames sharing the same columns, e.g. one per account
+        """
+        header = True
+        for chunk in self._chunks(frames):
+            yield chunk.to_csv(index=False, header=header).encode("utf-8")
+            header = False
+
+    def stream_export(self, frames: Iterable[pd.DataFrame], fmt: str, sink: Union[str, IO[bytes]]) -> None:
+        """
+        Write frames to a file or binary stream in chunks, without building one payload in memory.
+
+        Args:
+            frames: DataFrames sharing the same columns; may be a lazy generator
+            fmt: One of 'csv', 'parquet' or 'xlsx'
+            sink: File path or writable binary stream
+        """
+        if fmt == "csv":
+            self._stream_csv(frames, sink)
+        elif fmt == "parquet":
+            self._stream_parquet(frames, sink)
+        elif fmt == "xlsx":
+            self._stream_xlsx(frames, sink)
+        else:
+            raise ValueError(f"Unsupported export format: {fmt}. Use one of {list(EXPORT_FORMATS)}")
+
+    def _stream_csv(self, frames: Iterable[pd.DataFrame], sink: Union[str, IO[bytes]]) -> None:
+        if isinstance(sink, str):
+            with open(sink, "wb") as f:
+                self._stream_csv(frames, f)
+            return
+        for piece in self.iter_csv(frames):
+            sink.write(piece)
+
+    def _stream_parquet(self, frames: Iterable[pd.DataFrame], sink: Union[str, IO[bytes]]) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export requires pyarrow: pip install pyarrow") from e
+
+        writer = None
+        try:
+            for chunk in self._chunks(frames):
+                table = pa.Table.from_pandas(self._stable_types(chunk), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(sink, table.schema)
+                else:
+                    table = table.cast(writer.schema)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    @staticmethod
+    def _stable_types(chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Widen column types so every chunk maps to the same parquet schema.
+
+        The writer's schema comes from the first chunk, so a later chunk must
+        not need a wider type: integer columns become float64 (an account with
+        weights of 50 may come before one with 33.33) and text columns become
+        strings (an all-empty column would otherwise be typed null).
+        """
+        chunk = chunk.copy()
+        for col in chunk.columns:
+            dtype = chunk[col].dtype
+            if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+                chunk[col] = chunk[col].astype("float64")
+            elif dtype == object or pd.api.types.is_string_dtype(dtype):
+                chunk[col] = chunk[col].astype("string")
+        return chunk
+
+    def _stream_xlsx(self, frames: Iterable[pd.DataFrame], sink: Union[str, IO[bytes]]) -> None:
+        try:
+            from openpyxl import Workbook
+        except ImportError as e:
+            raise ImportError("Excel export requires openpyxl: pip install openpyxl") from e
+
+        # Write-only workbooks flush rows to a temporary file instead of keeping cells in memory
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Portfolio")
+        header = True
+        for chunk in self._chunks(frames):
+            if header:
+                sheet.append([str(col) for col in chunk.columns])
+                header = False
+            for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None):
+                sheet.append(list(row))
+        workbook.save(sink)
+
+
+# Process-wide instance so payloads are shared across sessions and reruns
+export_service = ExportService()
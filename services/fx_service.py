@@ -0,0 +1,226 @@
+"""
+FX service for detecting quote currencies and fetching exchange rates.
+"""
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import threading
+import time
+
+from services.price_providers import PriceProvider, get_price_provider
+from config.settings import app_config
+
+logger = logging.getLogger(__name__)
+
+
+# Yahoo ticker suffix -> quote currency, used when the price provider has not reported one.
+# Tickers without a suffix are US listings. Exchanges quoting lines in several currencies or
+# in minor units (e.g. London, mostly GBp) are left out, so their currency stays unknown.
+SUFFIX_CURRENCIES: Dict[str, str] = {
+    "NS": "INR",
+    "BO": "INR",
+    "DE": "EUR",
+    "PA": "EUR",
+    "AS": "EUR",
+    "MI": "EUR",
+    "T": "JPY",
+    "HK": "HKD",
+    "SI": "SGD",
+    "AX": "AUD",
+    "TO": "CAD",
+    "SW": "CHF",
+}
+DEFAULT_CURRENCY = "USD"
+
+# Minor-unit codes Yahoo quotes some listings in -> (major currency, minor units per major unit)
+MINOR_UNITS: Dict[str, Tuple[str, float]] = {
+    "GBp": ("GBP", 100.0),
+    "GBX": ("GBP", 100.0),
+    "ZAc": ("ZAR", 100.0),
+    "ZAC": ("ZAR", 100.0),
+    "ILA": ("ILS", 100.0),
+}
+
+
+def detect_currency(ticker: str) -> Optional[str]:
+    """
+    Detect the quote currency of a ticker from its exchange suffix.
+
+    Args:
+        ticker: Stock ticker symbol (e.g., 'TCS.NS', 'VOO')
+
+    Returns:
+        ISO currency code, or None if the suffix does not pin down a currency
+    """
+    ticker = str(ticker).strip().upper()
+    if "." in ticker:
+        suffix = ticker.rsplit(".", 1)[1]
+        return SUFFIX_CURRENCIES.get(suffix)
+    return DEFAULT_CURRENCY
+
+
+def major_currency(currency: str) -> Tuple[str, float]:
+    """
+    Split a quote currency into its major currency and the units per major unit.
+
+    Returns:
+        ('GBP', 100.0) for 'GBp' (pence), otherwise (currency, 1.0)
+    """
+    return MINOR_UNITS.get(currency, (currency, 1.0))
+
+
+def fx_pair_ticker(currency: str, base_currency: str) -> str:
+    """Get the Yahoo ticker quoting one unit of `currency` (minor units map to their major) in `base_currency`."""
+    return f"{major_currency(currency)[0]}{base_currency}=X"
+
+
+class FxProvider:
+    """Fetches FX rates through a price provider in a single batched download."""
+
+    def __init__(self, price_provider: Optional[PriceProvider] = None):
+        self.price_provider = price_provider or get_price_provider(app_config)
+
+    def get_currencies(self, tickers: Iterable[str]) -> Dict[str, str]:
+        """Quote currencies the price provider reported for the tickers it has priced."""
+        currencies = {}
+        for ticker in tickers:
+            currency = self.price_provider.currency(ticker)
+            if currency:
+                currencies[ticker] = currency
+        return currencies
+
+    def get_rates(self, currencies: Iterable[str], base_currency: str) -> Dict[str, float]:
+        """
+        Fetch rates converting each currency into the base currency.
+
+        Args:
+            currencies: ISO codes to convert from
+            base_currency: ISO code to convert into
+
+        Returns:
+            Mapping of currency -> rate; currencies that failed are omitted
+        """
+        currencies = sorted({c for c in currencies if c and c != base_currency})
+        rates = {base_currency: 1.0}
+        if not currencies:
+            return rates
+
+        pairs = [fx_pair_ticker(c, base_currency) for c in currencies]
+        try:
+            closes = self.price_provider.download(pairs, period="5d")
+        except Exception as e:
+            logger.error(f"Error fetching FX rates for {pairs}: {e}")
+            return rates
+
+        if closes.empty:
+            logger.warning(f"No FX data found for pairs: {pairs}")
+            return rates
+
+        last = closes.ffill().iloc[-1]
+        for currency, pair in zip(currencies, pairs):
+            rate = last.get(pair)
+            if rate is not None and pd.notna(rate):
+                rates[currency] = round(float(rate), 6)
+            else:
+                logger.warning(f"Could not fetch FX rate for {pair}")
+        return rates
+
+
+class StaticFxProvider(FxProvider):
+    """FX provider serving fixed rates (and optionally ticker currencies), for offline runs and tests."""
+
+    def __init__(self, rates: Dict[str, float], currencies: Optional[Dict[str, str]] = None):
+        self.rates = dict(rates)
+        self.currencies = dict(currencies or {})
+
+    def get_currencies(self, tickers: Iterable[str]) -> Dict[str, str]:
+        return {ticker: self.currencies[ticker] for ticker in tickers if ticker in self.currencies}
+
+    def get_rates(self, currencies: Iterable[str], base_currency: str) -> Dict[str, float]:
+        rates = {base_currency: 1.0}
+        for currency in currencies:
+            if currency in self.rates:
+                rates[currency] = self.rates[currency]
+        return rates
+
+
+class FxService:
+    """Service for resolving ticker currencies and conversion rates."""
+
+    def __init__(self, base_currency: str = "INR", provider: Optional[FxProvider] = None,
+                 retry_seconds: float = 300.0):
+        """
+        Args:
+            base_currency: ISO code all rates convert into
+            provider: Source of FX rates
+            retry_seconds: How long a currency whose rate could not be fetched is not retried
+        """
+        self.base_currency = base_currency
+        self.provider = provider or FxProvider()
+        self.retry_seconds = retry_seconds
+        self._failed: Dict[str, float] = {}
+        self._failed_lock = threading.Lock()
+
+    def get_ticker_currencies(self, tickers: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Get the quote currency of each ticker.
+
+        The currency reported by the price provider wins; tickers it has not
+        priced yet fall back to their exchange suffix, and are None when that
+        is ambiguous, so that validation blocks them instead of guessing.
+        """
+        reported = self.provider.get_currencies(tickers)
+        return {ticker: reported.get(ticker) or detect_currency(ticker) for ticker in tickers}
+
+    def get_fx_rates(self, currencies: Iterable[str], price_cache: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        """
+        Get conversion rates into the base currency, fetching only what the cache lacks.
+
+        Rates are stored in `price_cache` under their Yahoo pair ticker
+        (e.g. 'USDINR=X') so they live alongside the stock prices. Minor-unit
+        currencies such as 'GBp' share their major currency's pair and get its
+        rate divided by 100. Currencies whose rate could not be fetched are
+        left out of the result and are not retried for `retry_seconds`.
+
+        Args:
+            currencies: ISO codes held in the portfolio
+            price_cache: Optional price cache to read from and populate
+
+        Returns:
+            Mapping of currency -> rate into the base currency
+        """
+        cache = price_cache if price_cache is not None else {}
+        rates = {self.base_currency: 1.0}
+        missing = []
+        for currency in set(currencies):
+            if not isinstance(currency, str) or not currency or currency == self.base_currency:
+                continue
+            major, units = major_currency(currency)
+            if major == self.base_currency:
+                rates[currency] = 1.0 / units
+                continue
+            pair = fx_pair_ticker(currency, self.base_currency)
+            if pair in cache:
+                rates[currency] = cache[pair] / units
+            else:
+                missing.append(currency)
+
+        now = time.monotonic()
+        with self._failed_lock:
+            missing = [c for c in missing if now - self._failed.get(c, float("-inf")) >= self.retry_seconds]
+
+        if missing:
+            fetched = self.provider.get_rates({major_currency(c)[0] for c in missing}, self.base_currency)
+            for currency in missing:
+                major, units = major_currency(currency)
+                if major in fetched:
+                    rates[currency] = fetched[major] / units
+                    cache[fx_pair_ticker(currency, self.base_currency)] = fetched[major]
+                    logger.info(f"Updated FX rate for {currency}/{self.base_currency}: {rates[currency]}")
+            with self._failed_lock:
+                for currency in missing:
+                    if major_currency(currency)[0] in fetched:
+                        self._failed.pop(currency, None)
+                    else:
+                        self._failed[currency] = now
+        return rates
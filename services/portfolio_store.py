@@ -0,0 +1,253 @@
+"""
+SQLite-backed multi-account portfolio storage.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import logging
+import pandas as pd
+import numpy as np
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS holdings (
+    account_id TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    shares_held INTEGER NOT NULL DEFAULT 0,
+    target_weight REAL NOT NULL DEFAULT 0,
+    current_price REAL,
+    currency TEXT,
+    position INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (account_id, ticker)
+);
+CREATE INDEX IF NOT EXISTS idx_holdings_ticker ON holdings (ticker);
+CREATE TABLE IF NOT EXISTS accounts (
+    account_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+# DataFrame column -> holdings table column
+COLUMN_MAP = {
+    "Ticker": "ticker",
+    "Shares Held": "shares_held",
+    "Target Weight (%)": "target_weight",
+    "Current Price (per share)": "current_price",
+    "Currency": "currency",
+}
+
+# Columns added after the first release: column -> definition, applied to older databases on open
+MIGRATIONS = {
+    "currency": "currency TEXT",
+}
+
+
+class PortfolioConflictError(RuntimeError):
+    """Raised when an account was saved by another session since it was loaded."""
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared across threads."""
+
+    def __init__(self, db_path: str, size: int = 8, timeout: float = 30.0):
+        self.db_path = db_path
+        self.timeout = timeout
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            isolation_level=None,  # explicit BEGIN/COMMIT
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection, returning it to the pool afterwards."""
+        conn = self._pool.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class SQLitePortfolioStore:
+    """Stores per-account portfolios in a SQLite database in WAL mode."""
+
+    def __init__(self, db_path: str = "data/portfolios.db", pool_size: int = 8):
+        self.db_path = db_path
+        dir_path = os.path.dirname(db_path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+        self.pool = ConnectionPool(db_path, size=pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(holdings)")}
+            for column, definition in MIGRATIONS.items():
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE holdings ADD COLUMN {definition}")
+
+    @contextmanager
+    def _transaction(self, immediate: bool = False) -> Iterator[sqlite3.Connection]:
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def has_account(self, account_id: str) -> bool:
+        """Check whether any holdings are stored for an account."""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM holdings WHERE account_id = ? LIMIT 1", (account_id,)
+            ).fetchone()
+        return row is not None
+
+    def list_accounts(self) -> List[str]:
+        """List all accounts with stored holdings."""
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT DISTINCT account_id FROM holdings ORDER BY account_id").fetchall()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _version(conn: sqlite3.Connection, account_id: str) -> int:
+        row = conn.execute("SELECT version FROM accounts WHERE account_id = ?", (account_id,)).fetchone()
+        return row[0] if row else 0
+
+    def load_portfolio(self, account_id: str) -> Tuple[pd.DataFrame, int]:
+        """
+        Load one account's holdings together with their version.
+
+        Args:
+            account_id: Account identifier
+
+        Returns:
+            Tuple of (DataFrame with the user-editable portfolio columns, version
+            to pass back to `save_portfolio`)
+        """
+        # Holdings and version are read in one transaction, so they always match
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT ticker, shares_held, target_weight, current_price, currency FROM holdings "
+                "WHERE account_id = ? ORDER BY position",
+                (account_id,),
+            ).fetchall()
+            version = self._version(conn, account_id)
+        df = pd.DataFrame(rows, columns=list(COLUMN_MAP))
+        df["Current Price (per share)"] = df["Current Price (per share)"].astype(float)
+        return df, version
+
+    def save_portfolio(self, account_id: str, df: pd.DataFrame, expected_version: Optional[int] = None) -> int:
+        """
+        Upsert one account's holdings and drop tickers no longer held.
+
+        The whole save runs in a single write transaction, so concurrent
+        sessions never see or leave behind a half-written portfolio. With
+        `expected_version`, the save only succeeds if nobody else saved the
+        account since that version was loaded.
+
+        Args:
+            account_id: Account identifier
+            df: DataFrame with at least 'Ticker', 'Shares Held' and 'Target Weight (%)';
+                'Currency' holds quote currencies set by the user
+            expected_version: Version returned by `load_portfolio`, or None to overwrite unconditionally
+
+        Returns:
+            The account's new version
+
+        Raises:
+            PortfolioConflictError: If the stored version differs from `expected_version`
+        """
+        prices = df["Current Price (per share)"] if "Current Price (per share)" in df.columns else pd.Series(np.nan, index=df.index)
+        currencies = df["Currency"] if "Currency" in df.columns else pd.Series(None, index=df.index, dtype=object)
+        rows = [
+            (account_id, str(ticker), int(shares) if pd.notna(shares) else 0, float(weight), None if pd.isna(price) else float(price),
+             str(currency) if pd.notna(currency) and str(currency).strip() else None, position)
+            for position, (ticker, shares, weight, price, currency) in enumerate(
+                zip(df["Ticker"], df["Shares Held"], df["Target Weight (%)"], prices, currencies)
+            )
+        ]
+        tickers = [row[1] for row in rows]
+        with self._transaction(immediate=True) as conn:
+            # BEGIN IMMEDIATE holds the write lock, so the check and the write are atomic
+            current_version = self._version(conn, account_id)
+            if expected_version is not None and current_version != expected_version:
+                raise PortfolioConflictError(
+                    f"Account {account_id} was changed by another session "
+                    f"(version {current_version}, loaded {expected_version})"
+                )
+            conn.executemany(
+                "INSERT INTO holdings (account_id, ticker, shares_held, target_weight, current_price, currency, position) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (account_id, ticker) DO UPDATE SET "
+                "shares_held = excluded.shares_held, target_weight = excluded.target_weight, "
+                "current_price = excluded.current_price, currency = excluded.currency, position = excluded.position, "
+                "updated_at = CURRENT_TIMESTAMP",
+                rows,
+            )
+            placeholders = ",".join("?" * len(tickers))
+            conn.execute(
+                f"DELETE FROM holdings WHERE account_id = ? AND ticker NOT IN ({placeholders})",
+                [account_id, *tickers],
+            )
+            conn.execute(
+                "INSERT INTO accounts (account_id, version) VALUES (?, 1) "
+                "ON CONFLICT (account_id) DO UPDATE SET version = version + 1, updated_at = CURRENT_TIMESTAMP",
+                (account_id,),
+            )
+        logger.info(f"Saved {len(rows)} holdings for account {account_id} (version {current_version + 1})")
+        return current_version + 1
+
+    def delete_account(self, account_id: str) -> None:
+        """Remove all holdings for an account."""
+        with self._transaction(immediate=True) as conn:
+            conn.execute("DELETE FROM holdings WHERE account_id = ?", (account_id,))
+            # Bump rather than reset the version, so sessions that loaded the old holdings still conflict
+            conn.execute(
+                "UPDATE accounts SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE account_id = ?",
+                (account_id,),
+            )
+
+    def accounts_holding(self, ticker: str) -> List[str]:
+        """List accounts that hold a ticker (uses the ticker index)."""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT account_id FROM holdings WHERE ticker = ? ORDER BY account_id", (ticker,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+
+_stores: Dict[str, SQLitePortfolioStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_portfolio_store(db_path: str) -> SQLitePortfolioStore:
+    """Get the process-wide store for a database, so all sessions share one pool."""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = SQLitePortfolioStore(db_path)
+            _stores[db_path] = store
+        return store
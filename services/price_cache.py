@@ -0,0 +1,103 @@
+"""
+Thread-safe price cache shared between workers and sessions.
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, MutableMapping, Optional
+
+
+class PriceCache(MutableMapping):
+    """
+    Dictionary-like cache of ticker -> price with an optional time-to-live.
+
+    Besides stock prices it also holds FX rates under their pair tickers
+    (e.g. 'USDINR=X'), so it can be passed anywhere a plain dict cache is used.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds
+        self._data: Dict[str, tuple] = {}
+        self._lock = threading.RLock()
+        # Ticker -> event set when the fetch in flight for it finishes
+        self._in_flight: Dict[str, threading.Event] = {}
+
+    def _is_fresh(self, stored_at: float) -> bool:
+        return self.ttl_seconds is None or time.monotonic() - stored_at < self.ttl_seconds
+
+    def __getitem__(self, ticker: str) -> float:
+        with self._lock:
+            price, stored_at = self._data[ticker]
+            if not self._is_fresh(stored_at):
+                del self._data[ticker]
+                raise KeyError(ticker)
+            return price
+
+    def __setitem__(self, ticker: str, price: float) -> None:
+        with self._lock:
+            self._data[ticker] = (price, time.monotonic())
+
+    def __delitem__(self, ticker: str) -> None:
+        with self._lock:
+            del self._data[ticker]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            return iter([t for t, (_, stored_at) in self._data.items() if self._is_fresh(stored_at)])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(1 for _, stored_at in self._data.values() if self._is_fresh(stored_at))
+
+    def get_many(self, tickers: Iterable[str]) -> Dict[str, float]:
+        """Get cached prices for the tickers that are present and fresh."""
+        prices = {}
+        with self._lock:
+            for ticker in tickers:
+                # One lookup per ticker, so an entry expiring mid-call is simply skipped
+                price = self.get(ticker)
+                if price is not None:
+                    prices[ticker] = price
+        return prices
+
+    def get_or_fetch(self, tickers: Iterable[str], fetch: Callable[[List[str]], Dict[str, float]]) -> Dict[str, float]:
+        """
+        Get prices for the tickers, fetching only those missing from the cache.
+
+        Tickers another caller is already fetching are not fetched again; this
+        call waits for that fetch and takes its result from the cache instead.
+
+        Args:
+            tickers: Tickers to price
+            fetch: Callable taking the missing tickers and returning their prices
+
+        Returns:
+            Mapping of ticker -> price for every ticker that could be priced
+        """
+        tickers = list(dict.fromkeys(tickers))
+        prices = self.get_many(tickers)
+        missing = [ticker for ticker in tickers if ticker not in prices]
+        if not missing:
+            return prices
+
+        done = threading.Event()
+        with self._lock:
+            owned = [ticker for ticker in missing if ticker not in self._in_flight]
+            awaited = {ticker: self._in_flight[ticker] for ticker in missing if ticker in self._in_flight}
+            for ticker in owned:
+                self._in_flight[ticker] = done
+
+        if owned:
+            try:
+                fetched = fetch(owned)
+                self.update(fetched)
+                prices.update(fetched)
+            finally:
+                with self._lock:
+                    for ticker in owned:
+                        del self._in_flight[ticker]
+                done.set()
+
+        for event in set(awaited.values()):
+            event.wait()
+        prices.update(self.get_many(awaited))
+        return prices
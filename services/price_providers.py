@@ -0,0 +1,333 @@
+"""
+Price providers: live Yahoo Finance access plus record/replay for offline runs.
+
+A provider returns daily price history with a 'Close' column, shaped like
+`yf.Ticker(...).history`, and reports the quote currency of the tickers it priced. The recording provider captures live responses to a
+compact cassette file; the replay provider serves them back without network
+access, optionally with injected latency and errors.
+"""
+import atexit
+import gzip
+import json
+import logging
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+import yfinance as yf
+import pandas as pd
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_VERSION = 1
+
+
+class PriceProvider(ABC):
+    """Base provider; subclasses implement `history`."""
+
+    @abstractmethod
+    def history(self, ticker: str, period: str = "1d") -> pd.DataFrame:
+        """
+        Get daily price history for a ticker.
+
+        Returns:
+            DataFrame indexed by date with at least a 'Close' column; empty if no data
+        """
+
+    def download(self, tickers: List[str], period: str = "1d") -> pd.DataFrame:
+        """
+        Get closing prices for several tickers.
+
+        Returns:
+            DataFrame indexed by date with one column of closes per ticker
+        """
+        closes = {}
+        for ticker in tickers:
+            history = self.history(ticker, period)
+            if not history.empty:
+                closes[ticker] = history["Close"]
+        return pd.DataFrame(closes)
+
+    def currency(self, ticker: str) -> Optional[str]:
+        """
+        Get the currency a ticker's prices are quoted in, as reported by the source.
+
+        Never makes a request of its own, so it is only known for tickers
+        this provider has already priced.
+
+        Returns:
+            Currency code as reported (e.g. 'GBp' for pence), or None if unknown
+        """
+        return None
+
+
+class YahooPriceProvider(PriceProvider):
+    """Fetches prices live from Yahoo Finance."""
+
+    def __init__(self):
+        self._currencies: Dict[str, str] = {}
+
+    def history(self, ticker: str, period: str = "1d") -> pd.DataFrame:
+        yf_ticker = yf.Ticker(ticker)
+        history = yf_ticker.history(period=period)
+        # The currency arrives with the price response, so reading it costs no extra request
+        try:
+            currency = (yf_ticker.history_metadata or {}).get("currency")
+        except Exception:
+            currency = None
+        if currency:
+            self._currencies[ticker] = currency
+        return history
+
+    def currency(self, ticker: str) -> Optional[str]:
+        return self._currencies.get(ticker)
+
+    def download(self, tickers: List[str], period: str = "1d") -> pd.DataFrame:
+        if not tickers:
+            return pd.DataFrame()
+        data = yf.download(tickers, period=period, progress=False, auto_adjust=False)
+        if data.empty:
+            return pd.DataFrame()
+        closes = data["Close"]
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(tickers[0])
+        return closes
+
+
+class Cassette:
+    """
+    Compact store of recorded closing prices keyed by ticker and period.
+
+    Saved as JSON, gzip-compressed when the path ends in '.gz'.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, Dict[str, list]] = {}
+        self.currencies: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(ticker: str, period: str) -> str:
+        return f"{ticker}|{period}"
+
+    def _open(self, path: str, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(path, mode + "t", encoding="utf-8")
+        return open(path, mode, encoding="utf-8")
+
+    def load(self) -> "Cassette":
+        """Load entries from disk if the cassette exists."""
+        if os.path.exists(self.path):
+            with self._open(self.path, "r") as f:
+                data = json.load(f)
+            self.entries = data.get("entries", {})
+            self.currencies = data.get("currencies", {})
+            logger.info(f"Loaded {len(self.entries)} recorded price series from {self.path}")
+        return self
+
+    def save(self) -> None:
+        """Write entries to disk atomically."""
+        with self._lock:
+            dir_path = os.path.dirname(self.path)
+            if dir_path:
+                os.makedirs(dir_path, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with self._open(tmp_path, "w") as f:
+                json.dump({"version": CASSETTE_VERSION, "entries": self.entries, "currencies": self.currencies},
+                          f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+
+    def record(self, ticker: str, period: str, closes: pd.Series) -> None:
+        """Store the closing prices of one series."""
+        closes = closes.dropna()
+        entry = {
+            "dates": [ts.strftime("%Y-%m-%d") for ts in pd.to_datetime(closes.index)],
+            "close": [round(float(value), 6) for value in closes],
+        }
+        with self._lock:
+            self.entries[self.key(ticker, period)] = entry
+
+    def record_currency(self, ticker: str, currency: str) -> None:
+        """Store the quote currency of a ticker."""
+        with self._lock:
+            self.currencies[ticker] = currency
+
+    def currency(self, ticker: str) -> Optional[str]:
+        """Recorded quote currency of a ticker, or None if not recorded."""
+        return self.currencies.get(ticker)
+
+    def history(self, ticker: str, period: str) -> Optional[pd.DataFrame]:
+        """Rebuild a recorded series as a history DataFrame, or None if not recorded."""
+        entry = self.entries.get(self.key(ticker, period))
+        if entry is None:
+            return None
+        index = pd.DatetimeIndex(pd.to_datetime(entry["dates"]), name="Date")
+        return pd.DataFrame({"Close": entry["close"]}, index=index)
+
+
+class RecordingPriceProvider(PriceProvider):
+    """
+    Passes requests to another provider and records every response to a cassette.
+
+    The cassette is rewritten once per batch download, but single-ticker
+    recordings are only written every `save_interval` seconds and at exit,
+    since rewriting the whole file per ticker grows quadratically with a run.
+
+    Args:
+        inner: Provider whose responses are recorded
+        cassette_path: File the recordings are saved to
+        save_interval: Minimum seconds between saves triggered by `history`
+    """
+
+    def __init__(self, inner: PriceProvider, cassette_path: str, save_interval: float = 5.0):
+        self.inner = inner
+        self.cassette = Cassette(cassette_path).load()
+        self.save_interval = save_interval
+        self._dirty = False
+        self._last_saved = time.monotonic()
+        self._save_lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def flush(self) -> None:
+        """Save the cassette if anything was recorded since the last save."""
+        with self._save_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            self._last_saved = time.monotonic()
+        self.cassette.save()
+
+    def history(self, ticker: str, period: str = "1d") -> pd.DataFrame:
+        history = self.inner.history(ticker, period)
+        if not history.empty:
+            self.cassette.record(ticker, period, history["Close"])
+            currency = self.inner.currency(ticker)
+            if currency:
+                self.cassette.record_currency(ticker, currency)
+            with self._save_lock:
+                self._dirty = True
+                due = time.monotonic() - self._last_saved >= self.save_interval
+            if due:
+                self.flush()
+        return history
+
+    def download(self, tickers: List[str], period: str = "1d") -> pd.DataFrame:
+        closes = self.inner.download(tickers, period)
+        for ticker in closes.columns:
+            self.cassette.record(ticker, period, closes[ticker])
+        if not closes.empty:
+            with self._save_lock:
+                self._dirty = True
+            self.flush()
+        return closes
+
+    def currency(self, ticker: str) -> Optional[str]:
+        return self.inner.currency(ticker)
+
+
+class ReplayError(RuntimeError):
+    """Error injected by the replay provider to simulate provider failures."""
+
+
+class ReplayPriceProvider(PriceProvider):
+    """
+    Serves recorded prices from a cassette without network access.
+
+    Args:
+        cassette_path: Cassette written by RecordingPriceProvider
+        latency_ms: Delay added to every call, simulating provider round trips
+        jitter_ms: Extra uniformly random delay of up to this many milliseconds
+        error_rate: Probability (0-1) that a call raises ReplayError
+        seed: Seed for the latency and error draws, for reproducible runs
+    """
+
+    def __init__(self, cassette_path: str, latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, seed: Optional[int] = None):
+        self.cassette = Cassette(cassette_path).load()
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _simulate_call(self, what: str) -> None:
+        with self._lock:
+            delay = self.latency_ms + self._random.uniform(0, self.jitter_ms)
+            fail = self._random.random() < self.error_rate
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        if fail:
+            raise ReplayError(f"Injected replay error for {what}")
+
+    def history(self, ticker: str, period: str = "1d") -> pd.DataFrame:
+        self._simulate_call(ticker)
+        history = self.cassette.history(ticker, period)
+        if history is None:
+            logger.warning(f"No recorded prices for {ticker} ({period})")
+            return pd.DataFrame(columns=["Close"])
+        return history
+
+    def download(self, tickers: List[str], period: str = "1d") -> pd.DataFrame:
+        self._simulate_call(",".join(tickers))
+        closes = {}
+        for ticker in tickers:
+            history = self.cassette.history(ticker, period)
+            if history is not None:
+                closes[ticker] = history["Close"]
+        return pd.DataFrame(closes)
+
+    def currency(self, ticker: str) -> Optional[str]:
+        return self.cassette.currency(ticker)
+
+
+def create_price_provider(config) -> PriceProvider:
+    """
+    Create the price provider selected by `config.PRICE_PROVIDER`.
+
+    Args:
+        config: AppConfig-like object
+
+    Returns:
+        'yahoo' -> YahooPriceProvider, 'record' -> RecordingPriceProvider
+        around Yahoo, 'replay' -> ReplayPriceProvider
+    """
+    name = config.PRICE_PROVIDER.lower()
+    if name == "yahoo":
+        return YahooPriceProvider()
+    if name == "record":
+        return RecordingPriceProvider(YahooPriceProvider(), config.PRICE_CASSETTE)
+    if name == "replay":
+        return ReplayPriceProvider(
+            config.PRICE_CASSETTE,
+            latency_ms=config.REPLAY_LATENCY_MS,
+            jitter_ms=config.REPLAY_JITTER_MS,
+            error_rate=config.REPLAY_ERROR_RATE,
+            seed=config.REPLAY_SEED,
+        )
+    raise ValueError(f"Unknown price provider: {config.PRICE_PROVIDER}. Use 'yahoo', 'record' or 'replay'")
+
+
+_providers: Dict[tuple, PriceProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_price_provider(config) -> PriceProvider:
+    """
+    Get the process-wide provider for the configured settings.
+
+    Sharing one instance means the cassette is loaded once and recordings from
+    all sessions land in the same file.
+    """
+    key = (
+        config.PRICE_PROVIDER.lower(), config.PRICE_CASSETTE, config.REPLAY_LATENCY_MS,
+        config.REPLAY_JITTER_MS, config.REPLAY_ERROR_RATE, config.REPLAY_SEED,
+    )
+    with _providers_lock:
+        provider = _providers.get(key)
+        if provider is None:
+            provider = create_price_provider(config)
+            _providers[key] = provider
+        return provider
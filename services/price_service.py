@@ -1,18 +1,28 @@
 """
 Price service for fetching stock prices using yfinance.
 """
-import yfinance as yf
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, List
 import logging
 import numpy as np
 
+from services.price_providers import PriceProvider, get_price_provider
+from config.settings import app_config
+
 logger = logging.getLogger(__name__)
 
 
 class PriceService:
     """Service for fetching and managing stock prices."""
     
+    def __init__(self, provider: Optional[PriceProvider] = None):
+        """
+        Args:
+            provider: Price source; defaults to the one selected by `PRICE_PROVIDER`
+        """
+        self.provider = provider or get_price_provider(app_config)
+    
     def get_stock_price(self, ticker: str) -> Optional[float]:
         """
         Fetch current stock price for a given ticker.
@@ -25,8 +35,7 @@ class PriceService:
         """
 
         try:
-            stock = yf.Ticker(ticker)
-            history = stock.history(period="1d")
+            history = self.provider.history(ticker, period="1d")
             
             if not history.empty:
                 price = history["Close"].iloc[-1]
@@ -39,22 +48,28 @@ class PriceService:
             logger.error(f"Error fetching price for {ticker}: {e}")
             return None
     
-    def get_portfolio_prices(self, tickers: List[str]) -> Dict[str, float]:
+    def get_portfolio_prices(self, tickers: List[str], max_workers: int = 1) -> Dict[str, float]:
         """
-        Update prices for all tickers in a portfolio DataFrame.
+        Fetch live prices for a list of tickers.
         
         Args:
-            df: DataFrame with 'Ticker' column and optionally 'Current Price (per share)'
+            tickers: Stock ticker symbols
+            max_workers: Number of concurrent fetches; 1 fetches serially
             
         Returns:
-            Updated DataFrame with current prices
+            Mapping of ticker -> price for every ticker that could be priced
         """
 
         prices = {}
 
         # Fetch live prices for all tickers
-        for ticker in tickers:
-            new_price = self.get_stock_price(ticker)
+        if max_workers > 1 and len(tickers) > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                fetched = list(pool.map(self.get_stock_price, tickers))
+        else:
+            fetched = [self.get_stock_price(ticker) for ticker in tickers]
+
+        for ticker, new_price in zip(tickers, fetched):
             if new_price is not None:
                 prices[ticker] = new_price
                 logger.info(f"Updated price for {ticker}: {new_price}")
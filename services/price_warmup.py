@@ -0,0 +1,242 @@
+"""
+Background price warm-up with stale-while-revalidate reads.
+
+Prices are fetched on a background thread into a process-wide PriceCache, so
+pages can render immediately with the last known prices and pick up fresh
+ones once they land. Last known prices survive restarts in a small snapshot
+file.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from services.fx_service import FxService, fx_pair_ticker, major_currency
+from services.price_cache import PriceCache
+from services.price_service import PriceService
+from config.settings import app_config
+
+logger = logging.getLogger(__name__)
+
+
+class PriceWarmup:
+    """
+    Fetches prices in the background and serves cached or last known values.
+
+    Args:
+        price_service: Service used to fetch stock prices
+        fx_service: Service used to fetch FX rates into the cache
+        cache: Shared cache of fresh prices; entries older than its TTL are refetched
+        snapshot_file: JSON file holding the last known price of every key
+        max_workers: Concurrent price fetches per refresh
+        retry_seconds: Minimum delay before refetching a key that could not be priced
+    """
+
+    def __init__(self, price_service: PriceService, fx_service: FxService, cache: PriceCache,
+                 snapshot_file: Optional[str] = None, max_workers: int = 8, retry_seconds: float = 60.0):
+        self.price_service = price_service
+        self.fx_service = fx_service
+        self.cache = cache
+        self.snapshot_file = snapshot_file
+        self.max_workers = max_workers
+        self.retry_seconds = retry_seconds
+        self.last_known: Dict[str, float] = {}
+        self.as_of: Optional[str] = None
+        self._in_flight: Set[str] = set()
+        self._attempted: Dict[str, float] = {}
+        self._started = False
+        self._lock = threading.Lock()
+        self._load_snapshot()
+
+    def _load_snapshot(self) -> None:
+        if not self.snapshot_file or not os.path.exists(self.snapshot_file):
+            return
+        try:
+            with open(self.snapshot_file, "r") as f:
+                data = json.load(f)
+            self.last_known = {key: float(price) for key, price in data.get("prices", {}).items()}
+            self.as_of = data.get("as_of")
+            logger.info(f"Loaded {len(self.last_known)} last known prices from {self.snapshot_file}")
+        except Exception as e:
+            logger.error(f"Error loading price snapshot: {e}")
+
+    def _save_snapshot(self) -> None:
+        if not self.snapshot_file:
+            return
+        try:
+            dir_path = os.path.dirname(self.snapshot_file)
+            if dir_path:
+                os.makedirs(dir_path, exist_ok=True)
+            with self._lock:
+                data = {"as_of": self.as_of, "prices": dict(self.last_known)}
+            # Several fetch threads (or server processes) may save at once, so each writes its own temp file
+            fd, tmp_path = tempfile.mkstemp(dir=dir_path or ".", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.snapshot_file)
+        except Exception as e:
+            logger.error(f"Error saving price snapshot: {e}")
+
+    def _pair_tickers(self, currencies: Iterable[str]) -> Dict[str, str]:
+        """FX pair ticker for each currency that needs a fetched rate (unknown currencies have none)."""
+        base = self.fx_service.base_currency
+        return {
+            c: fx_pair_ticker(c, base) for c in set(currencies)
+            if isinstance(c, str) and c and major_currency(c)[0] != base
+        }
+
+    def warm_start(self, load_portfolio: Callable[[], pd.DataFrame]) -> None:
+        """
+        Start fetching prices for the saved portfolio, once per process.
+
+        Args:
+            load_portfolio: Callable returning the saved portfolio DataFrame
+        """
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        try:
+            df = load_portfolio()
+        except Exception as e:
+            logger.error(f"Could not load portfolio for price warm-up: {e}")
+            return
+        tickers = df["Ticker"].dropna().astype(str).tolist()
+        currencies = None
+        if "Currency" in df.columns:
+            # Currencies set by the user override the detected ones
+            currencies = df["Currency"].where(df["Currency"].notna() & (df["Currency"] != ""),
+                                              df["Ticker"].map(self.fx_service.get_ticker_currencies(tickers)))
+            currencies = currencies.dropna().tolist()
+        logger.info(f"Warming up prices for {len(tickers)} saved holdings")
+        self.refresh(tickers, currencies)
+
+    def refresh(self, tickers: List[str], currencies: Optional[Iterable[str]] = None) -> None:
+        """
+        Fetch prices (and FX rates for their currencies) on a background thread.
+
+        Tickers that are already cached, being fetched, or failed within
+        `retry_seconds` are skipped. Returns without waiting for the fetch.
+
+        Args:
+            tickers: Tickers to price
+            currencies: Quote currencies to fetch rates for; detected from the tickers if omitted
+        """
+        if currencies is None:
+            currencies = self.fx_service.get_ticker_currencies(tickers).values()
+        pairs = self._pair_tickers(currencies)
+        now = time.monotonic()
+        with self._lock:
+            def due(key: str) -> bool:
+                return (key not in self.cache and key not in self._in_flight
+                        and now - self._attempted.get(key, float("-inf")) >= self.retry_seconds)
+
+            tickers = [t for t in dict.fromkeys(tickers) if due(t)]
+            pairs = {c: pair for c, pair in pairs.items() if due(pair)}
+            keys = tickers + list(pairs.values())
+            if not keys:
+                return
+            self._in_flight.update(keys)
+            for key in keys:
+                self._attempted[key] = now
+
+        threading.Thread(
+            target=self._fetch, args=(tickers, pairs), name="price-warmup", daemon=True
+        ).start()
+
+    def _fetch(self, tickers: List[str], pairs: Dict[str, str]) -> None:
+        started = time.perf_counter()
+        fetched: Dict[str, float] = {}
+        try:
+            if tickers:
+                fetched.update(self.price_service.get_portfolio_prices(tickers, max_workers=self.max_workers))
+                self.cache.update(fetched)
+            if pairs:
+                rates = self.fx_service.get_fx_rates(pairs.keys(), self.cache)
+                # Pairs hold the major currency's rate, as in the cache
+                fetched.update({pair: rates[c] * major_currency(c)[1] for c, pair in pairs.items() if c in rates})
+        except Exception as e:
+            logger.error(f"Background price fetch failed: {e}")
+        finally:
+            with self._lock:
+                self._in_flight.difference_update(tickers)
+                self._in_flight.difference_update(pairs.values())
+                self.last_known.update(fetched)
+                if fetched:
+                    self.as_of = datetime.now().isoformat(timespec="seconds")
+        if fetched:
+            self._save_snapshot()
+        logger.info(f"Fetched {len(fetched)}/{len(tickers) + len(pairs)} prices in the background "
+                    f"in {time.perf_counter() - started:.2f}s")
+
+    def get_prices(self, tickers: List[str], currencies: Iterable[str],
+                   fallback: Optional[Dict[str, float]] = None) -> Tuple[Dict[str, float], Dict[str, float], Set[str]]:
+        """
+        Get prices without blocking, refreshing anything stale in the background.
+
+        Fresh cached values are used where available; otherwise the last known
+        value (from the snapshot or `fallback`) is returned and marked stale.
+
+        Args:
+            tickers: Tickers to price
+            currencies: Quote currencies of the holdings
+            fallback: Last known prices to use when the snapshot has none (e.g. stored prices)
+
+        Returns:
+            Tuple of (ticker -> price, currency -> FX rate into the base currency,
+            set of tickers and FX pairs whose values are stale or missing)
+        """
+        currencies = list(currencies)
+        pairs = self._pair_tickers(currencies)
+        keys = list(dict.fromkeys(tickers)) + list(pairs.values())
+        values = self.cache.get_many(keys)
+        stale = {key for key in keys if key not in values}
+        if stale:
+            fallback = fallback or {}
+            with self._lock:
+                for key in stale:
+                    value = self.last_known.get(key, fallback.get(key))
+                    if value is not None and pd.notna(value):
+                        values[key] = value
+            self.refresh(tickers, currencies)
+
+        prices = {t: values[t] for t in tickers if t in values}
+        base = self.fx_service.base_currency
+        fx_rates = {base: 1.0}
+        for currency in set(currencies):
+            if isinstance(currency, str) and currency != base and major_currency(currency)[0] == base:
+                fx_rates[currency] = 1.0 / major_currency(currency)[1]
+        fx_rates.update({c: values[pair] / major_currency(c)[1] for c, pair in pairs.items() if pair in values})
+        return prices, fx_rates, stale
+
+    def is_pending(self, keys: Iterable[str]) -> bool:
+        """Check whether any of the keys is still being fetched."""
+        with self._lock:
+            return any(key in self._in_flight for key in keys)
+
+
+_warmups: Dict[tuple, PriceWarmup] = {}
+_warmups_lock = threading.Lock()
+
+
+def get_price_warmup(config=app_config) -> PriceWarmup:
+    """Get the process-wide warm-up service, so all sessions share one cache and fetch."""
+    key = (config.PRICE_SNAPSHOT_FILE, config.BASE_CURRENCY)
+    with _warmups_lock:
+        warmup = _warmups.get(key)
+        if warmup is None:
+            warmup = PriceWarmup(
+                PriceService(),
+                FxService(config.BASE_CURRENCY),
+                PriceCache(config.PRICE_CACHE_TTL),
+                snapshot_file=config.PRICE_SNAPSHOT_FILE,
+                max_workers=config.PRICE_WARMUP_WORKERS,
+            )
+            _warmups[key] = warmup
+        return warmup
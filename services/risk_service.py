@@ -0,0 +1,245 @@
+"""
+Risk service maintaining a cache of daily returns and their covariance matrix.
+
+The covariance is updated incrementally: days that arrive after the initial
+load are merged into running means and co-moments, and days leaving the
+lookback window are removed the same way, so each update costs
+O(new days x tickers^2) instead of a full recomputation.
+"""
+import logging
+import threading
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+from services.price_providers import PriceProvider, get_price_provider
+from config.settings import app_config
+
+logger = logging.getLogger(__name__)
+
+# Download periods used to catch up on missed days, with the calendar days each covers
+CATCH_UP_PERIODS = [("5d", 5), ("1mo", 28), ("3mo", 90), ("6mo", 180), ("1y", 365), ("2y", 730), ("5y", 1825)]
+
+
+class IncrementalCovariance:
+    """
+    Running sample covariance of a fixed set of columns.
+
+    Keeps the observation count, the mean vector and the co-moment matrix
+    sum((x - mean)(x - mean)'), which can be merged with or separated from the
+    statistics of another block of rows exactly (Chan et al. pairwise update).
+    """
+
+    def __init__(self, n_columns: int):
+        self.count = 0
+        self.mean = np.zeros(n_columns)
+        self.comoment = np.zeros((n_columns, n_columns))
+
+    @staticmethod
+    def _block_stats(rows: np.ndarray):
+        mean = rows.mean(axis=0)
+        centered = rows - mean
+        return len(rows), mean, centered.T @ centered
+
+    def add(self, rows: np.ndarray) -> None:
+        """Merge a block of observations (rows x columns) into the statistics."""
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        if len(rows) == 0:
+            return
+        n_b, mean_b, comoment_b = self._block_stats(rows)
+        n = self.count + n_b
+        delta = mean_b - self.mean
+        self.comoment += comoment_b + np.outer(delta, delta) * (self.count * n_b / n)
+        self.mean += delta * (n_b / n)
+        self.count = n
+
+    def remove(self, rows: np.ndarray) -> None:
+        """Remove a block of observations previously merged with `add`."""
+        rows = np.atleast_2d(np.asarray(rows, dtype=float))
+        if len(rows) == 0:
+            return
+        n_b, mean_b, comoment_b = self._block_stats(rows)
+        n = self.count - n_b
+        if n <= 0:
+            self.__init__(len(self.mean))
+            return
+        mean = (self.count * self.mean - n_b * mean_b) / n
+        delta = mean_b - mean
+        self.comoment -= comoment_b + np.outer(delta, delta) * (n * n_b / self.count)
+        self.mean = mean
+        self.count = n
+
+    @property
+    def covariance(self) -> np.ndarray:
+        """Sample covariance (ddof=1); zeros until there are two observations."""
+        if self.count < 2:
+            return np.zeros_like(self.comoment)
+        return self.comoment / (self.count - 1)
+
+
+class RiskService:
+    """
+    Service caching daily returns for a growing ticker universe and their covariance.
+
+    Args:
+        provider: Price source for daily closes; defaults to the configured provider
+        history_period: Period of history downloaded for tickers seen for the first time
+        lookback_days: Number of most recent daily returns the covariance covers
+        refresh_seconds: Minimum interval between checks for newly arrived days
+    """
+
+    def __init__(self, provider: Optional[PriceProvider] = None, history_period: str = "1y",
+                 lookback_days: int = 252, refresh_seconds: float = 300.0):
+        self.provider = provider or get_price_provider(app_config)
+        self.history_period = history_period
+        self.lookback_days = lookback_days
+        self.refresh_seconds = refresh_seconds
+        self.closes = pd.DataFrame()
+        self.returns = pd.DataFrame()
+        self._cov = IncrementalCovariance(0)
+        self._last_checked = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def tickers(self) -> List[str]:
+        return list(self.closes.columns)
+
+    def _download(self, tickers: List[str], period: str) -> pd.DataFrame:
+        try:
+            closes = self.provider.download(tickers, period=period)
+        except Exception as e:
+            logger.error(f"Error fetching price history for {len(tickers)} tickers: {e}")
+            return pd.DataFrame()
+        if closes.empty:
+            return closes
+        closes.index = pd.to_datetime(closes.index).tz_localize(None).normalize()
+        return closes[~closes.index.duplicated(keep="last")].sort_index()
+
+    @staticmethod
+    def _catch_up_period(last_date: pd.Timestamp) -> str:
+        """Shortest download period that reaches back to the last cached day."""
+        gap = (pd.Timestamp.now().normalize() - last_date).days
+        for period, days in CATCH_UP_PERIODS:
+            if gap < days:
+                return period
+        return "max"
+
+    def _compute_returns(self) -> pd.DataFrame:
+        # Missing closes carry forward, so a day without a quote counts as a zero return
+        returns = self.closes.ffill().pct_change(fill_method=None).iloc[1:]
+        return returns.replace([np.inf, -np.inf], np.nan).fillna(0.0)
+
+    def _rebuild(self) -> None:
+        """Recompute the covariance over the lookback window from the cached returns."""
+        self.returns = self._compute_returns()
+        self._cov = IncrementalCovariance(len(self.returns.columns))
+        self._cov.add(self.returns.tail(self.lookback_days).to_numpy())
+        logger.info(f"Built covariance for {len(self.returns.columns)} tickers over {self._cov.count} days")
+
+    def _append_days(self, closes: pd.DataFrame) -> int:
+        """
+        Merge newly arrived closes and update the covariance incrementally.
+
+        The last cached day may have been fetched before the close (a partial
+        bar), so its refetched close replaces the cached one and its return is
+        swapped out of the covariance for the corrected value.
+        """
+        last_day = self.closes.index.max()
+        incoming = closes.loc[closes.index >= last_day].reindex(columns=self.closes.columns)
+        if incoming.empty:
+            return 0
+        # Tickers the refetch did not cover keep their cached close
+        incoming = incoming.combine_first(self.closes.loc[[last_day]])
+
+        # Only returns from the last cached day on can change; earlier ones depend on earlier closes only
+        old_tail = self.returns.loc[self.returns.index >= last_day]
+        self.closes = pd.concat([self.closes.iloc[:-1], incoming])
+        self.returns = self._compute_returns()
+        new_tail = self.returns.loc[self.returns.index >= last_day]
+        if np.array_equal(old_tail.to_numpy(), new_tail.iloc[:len(old_tail)].to_numpy()):
+            new_tail = new_tail.iloc[len(old_tail):]
+        elif self._cov.count:
+            self._cov.remove(old_tail.to_numpy())
+            logger.info(f"Replaced the return for {last_day.date()} with its revised close")
+        self._cov.add(new_tail.to_numpy())
+
+        # Drop the oldest days that fell out of the lookback window
+        overflow = self._cov.count - self.lookback_days
+        if overflow > 0:
+            start = len(self.returns) - self._cov.count
+            self._cov.remove(self.returns.iloc[start:start + overflow].to_numpy())
+        added = len(incoming) - 1
+        if added:
+            logger.info(f"Updated covariance with {added} new days")
+        return added
+
+    def refresh(self, tickers: List[str]) -> None:
+        """
+        Make sure returns and covariance cover the tickers and the latest days.
+
+        Tickers seen for the first time have their full history downloaded and
+        trigger a rebuild; otherwise only the days since the last cached one are
+        fetched, at most every `refresh_seconds`, and merged incrementally.
+        Downloads run outside the lock, so covariance reads never wait on the network.
+        """
+        tickers = [t for t in dict.fromkeys(tickers) if isinstance(t, str) and t]
+        with self._lock:
+            new_tickers = [t for t in tickers if t not in self.closes.columns]
+            if not new_tickers:
+                if self.closes.empty or time.monotonic() - self._last_checked < self.refresh_seconds:
+                    return
+                # Claimed before downloading, so concurrent callers do not fetch the same days
+                self._last_checked = time.monotonic()
+                known, period = self.tickers, self._catch_up_period(self.closes.index.max())
+
+        if new_tickers:
+            history = self._download(new_tickers, self.history_period)
+            with self._lock:
+                # Another caller may have added some of these tickers while this one downloaded
+                history = history.drop(columns=[t for t in history.columns if t in self.closes.columns])
+                if not history.empty:
+                    self.closes = history if self.closes.empty else self.closes.join(history, how="outer")
+                    self._rebuild()
+                    self._last_checked = time.monotonic()
+            return
+
+        closes = self._download(known, period)
+        if closes.empty:
+            return
+        with self._lock:
+            self._append_days(closes)
+
+    def covariance(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Get the daily return covariance, optionally restricted to some tickers.
+
+        Tickers without history are left out; callers treat them as riskless.
+        """
+        with self._lock:
+            matrix = self._cov.covariance
+            columns = self.returns.columns
+        if tickers is None:
+            return pd.DataFrame(matrix, index=columns, columns=columns)
+        positions = columns.get_indexer(list(dict.fromkeys(tickers)))
+        positions = positions[positions >= 0]
+        return pd.DataFrame(matrix[np.ix_(positions, positions)], index=columns[positions], columns=columns[positions])
+
+
+_risk_services: Dict[tuple, RiskService] = {}
+_risk_services_lock = threading.Lock()
+
+
+def get_risk_service(config=app_config) -> RiskService:
+    """Get the process-wide risk service, so all sessions share one returns cache."""
+    key = (config.PRICE_PROVIDER.lower(), config.RISK_HISTORY_PERIOD, config.RISK_LOOKBACK_DAYS)
+    with _risk_services_lock:
+        service = _risk_services.get(key)
+        if service is None:
+            service = RiskService(
+                history_period=config.RISK_HISTORY_PERIOD,
+                lookback_days=config.RISK_LOOKBACK_DAYS,
+                refresh_seconds=config.PRICE_CACHE_TTL,
+            )
+            _risk_services[key] = service
+        return service
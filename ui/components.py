@@ -3,7 +3,11 @@ UI components for the portfolio rebalancing application.
 """
 import streamlit as st
 import pandas as pd
-from typing import Optional
+from typing import List, Optional
+
+from services.export_service import EXPORT_FORMATS, export_service
+from utils.portfolio_utils import CURRENCY_SYMBOLS, format_currency
+from utils.validation import ValidationReport
 
 
 class PortfolioUIComponents:
@@ -20,6 +24,20 @@ class PortfolioUIComponents:
         """)
         st.markdown("---")
     
+    @staticmethod
+    def render_account_selector(default_account: str = "default") -> str:
+        """
+        Render the account selector in the sidebar.
+        
+        Args:
+            default_account: Account used when the field is left empty
+            
+        Returns:
+            Selected account identifier
+        """
+        account = st.sidebar.text_input("👤 Account", value=default_account)
+        return account.strip() or default_account
+    
     @staticmethod
     def render_data_input_selector():
         """Render a selector for data input method and optionally a CSV uploader.
@@ -55,6 +73,7 @@ class PortfolioUIComponents:
             "Ticker", 
             "Shares Held", 
             "Current Price (per share)", 
+            "Currency", 
             "Current Value", 
             "Current Weight (%)", 
             "Target Weight (%)"
@@ -72,6 +91,11 @@ class PortfolioUIComponents:
             df_reordered, 
             num_rows="dynamic", 
             use_container_width=True,
+            column_config={
+                "Currency": st.column_config.TextColumn(
+                    "Currency", help="Quote currency, e.g. USD or GBp (pence); leave blank to detect it"
+                ),
+            },
         )
         
         return edited_df
@@ -95,50 +119,170 @@ class PortfolioUIComponents:
             st.metric("🎯 Total Target Weight (%)", f"{total_target_weight}%")
     
     @staticmethod
-    def render_total_value(total_value: float) -> None:
+    def render_total_value(total_value: float, currency: str = "INR") -> None:
         """
         Render total portfolio value.
         
         Args:
             total_value: Total portfolio value
+            currency: Base currency code
+        """
+        st.markdown(f"**💰 Total Current Value: {format_currency(total_value, currency)}**")
+    
+    @staticmethod
+    def render_missing_fx_warning(currencies: List[str], base_currency: str = "INR") -> None:
         """
-        st.markdown(f"**💰 Total Current Value: ₹{total_value:,.2f}**")
+        Warn that holdings in some currencies are left out of the total value.
+        
+        Args:
+            currencies: Currencies without an FX rate
+            base_currency: Base currency code
+        """
+        st.warning(
+            f"⚠️ No {base_currency} exchange rate for {', '.join(currencies)}; "
+            f"those holdings are excluded from the total value and rebalancing is blocked."
+        )
+    
+    @staticmethod
+    def render_unknown_currency_warning(tickers: List[str]) -> None:
+        """
+        Warn that some holdings have no known quote currency and are left out of the total value.
+        
+        Args:
+            tickers: Tickers whose currency could not be detected
+        """
+        st.warning(
+            f"⚠️ Unknown quote currency for {', '.join(tickers)}; enter it in the Currency column "
+            f"(e.g. GBp for prices in pence). Until then those holdings are excluded and rebalancing is blocked."
+        )
     
     @staticmethod
-    def render_additional_capital_input() -> float:
+    def render_additional_capital_input(currency: str = "INR") -> float:
         """
         Render additional capital input.
         
+        Args:
+            currency: Base currency code
+        
         Returns:
             Additional capital amount
         """
+        symbol = CURRENCY_SYMBOLS.get(currency, currency)
         return st.number_input(
-            "💸 Optional: Enter additional amount to invest (₹)", 
+            f"💸 Optional: Enter additional amount to invest ({symbol})", 
             min_value=0, 
             value=0
         )
     
     @staticmethod
-    def render_rebalance_button() -> bool:
+    def render_rebalance_button(disabled: bool = False) -> bool:
         """
         Render rebalance button.
         
+        Args:
+            disabled: Whether the button is greyed out
+        
         Returns:
             True if button is clicked
         """
-        return st.button("🔄 Rebalance Portfolio")
+        return st.button("🔄 Rebalance Portfolio", disabled=disabled)
     
     @staticmethod
-    def render_rebalanced_portfolio(df: pd.DataFrame) -> None:
+    def render_capital_sweep_controls(currency: str = "INR", disabled: bool = False):
+        """
+        Render inputs for sweeping a grid of additional capital amounts.
+        
+        Args:
+            currency: Base currency code
+            disabled: Whether the run button is greyed out
+            
+        Returns:
+            Tuple of (max_amount, steps, target_deviation, run_clicked)
+        """
+        symbol = CURRENCY_SYMBOLS.get(currency, currency)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            max_amount = st.number_input(f"Maximum additional amount ({symbol})", min_value=0, value=100000, step=10000)
+        with col2:
+            steps = st.number_input("Grid points", min_value=2, max_value=5000, value=200)
+        with col3:
+            target_deviation = st.number_input("Target max deviation (%)", min_value=0.0, value=1.0, step=0.1)
+        run_clicked = st.button("📈 Run Capital Sweep", disabled=disabled)
+        return float(max_amount), int(steps), float(target_deviation), run_clicked
+    
+    @staticmethod
+    def render_capital_sweep_results(curve: pd.DataFrame, minimum_amount: Optional[float],
+                                     target_deviation: float, currency: str = "INR") -> None:
+        """
+        Render the additional capital sweep curve.
+        
+        Args:
+            curve: Sweep results, one row per amount
+            minimum_amount: Smallest amount meeting the target, if any
+            target_deviation: Target max deviation in percentage points
+            currency: Base currency code
+        """
+        indexed = curve.set_index("Additional Capital")
+        st.line_chart(indexed[["RMS Deviation (%)", "Max Deviation (%)"]])
+        st.line_chart(indexed[["Residual Cash"]])
+        st.line_chart(indexed[["Trades"]])
+        if minimum_amount is None:
+            st.warning(f"No amount in the grid keeps every holding within {target_deviation}% of its target.")
+        else:
+            st.markdown(
+                f"💡 Adding **{format_currency(minimum_amount, currency)}** is the smallest amount in the grid "
+                f"that keeps every holding within {target_deviation}% of its target weight."
+            )
+    
+    @staticmethod
+    def render_risk_button(disabled: bool = False) -> bool:
+        """
+        Render the button that runs the risk analysis.
+
+        Args:
+            disabled: Whether the button is greyed out
+
+        Returns:
+            True if button is clicked
+        """
+        st.caption("Uses a year of daily returns; the first run for new tickers downloads their history.")
+        return st.button("📉 Analyze Risk", disabled=disabled)
+
+    @staticmethod
+    def render_risk_metrics(metrics: dict, df: pd.DataFrame) -> None:
+        """
+        Render portfolio volatility, tracking error and per-holding risk contributions.
+
+        Args:
+            metrics: Output of `calculate_risk_metrics`
+            df: Portfolio DataFrame with risk contribution columns
+        """
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("📊 Volatility (annual)", f"{metrics['volatility']:.2f}%")
+        with col2:
+            st.metric("🎯 Target Volatility (annual)", f"{metrics['target_volatility']:.2f}%")
+        with col3:
+            st.metric("📐 Tracking Error vs Target", f"{metrics['tracking_error']:.2f}%")
+
+        contributions = df.set_index("Ticker")[
+            ["Current Weight (%)", "Target Weight (%)", "Risk Contribution (%)", "Active Risk Contribution (%)"]
+        ]
+        st.bar_chart(contributions[["Current Weight (%)", "Risk Contribution (%)"]])
+        st.dataframe(contributions, use_container_width=True)
+
+    @staticmethod
+    def render_rebalanced_portfolio(df: pd.DataFrame, currency: str = "INR") -> None:
         """
         Render the rebalanced portfolio results.
         
         Args:
             df: Rebalanced portfolio DataFrame
+            currency: Base currency code
         """
         st.markdown("### 🧾 Rebalanced Portfolio")
         st.dataframe(
-            PortfolioUIComponents.style_output(df), 
+            PortfolioUIComponents.style_output(df, currency), 
             use_container_width=True, 
             height=500
         )
@@ -146,32 +290,42 @@ class PortfolioUIComponents:
     @staticmethod
     def render_download_button(df: pd.DataFrame) -> None:
         """
-        Render download button for CSV export.
+        Render download button for exporting results.
+        
+        The file is only serialized when the user clicks download, and
+        repeated downloads of the same result reuse the cached payload.
         
         Args:
             df: DataFrame to export
         """
-        csv = df.to_csv(index=False).encode('utf-8')
+        fmt = st.selectbox(
+            "Export format",
+            options=list(EXPORT_FORMATS),
+            format_func=str.upper,
+            key="export_format",
+        )
         st.download_button(
-            "📥 Download Result as CSV", 
-            csv, 
-            "rebalanced_portfolio.csv", 
-            "text/csv"
+            f"📥 Download Result as {fmt.upper()}", 
+            lambda: export_service.export(df, fmt), 
+            export_service.file_name("rebalanced_portfolio", fmt), 
+            export_service.mime_type(fmt),
+            on_click="ignore",
         )
     
     @staticmethod
-    def render_suggestion_message(suggested_amount: float, additional_amount: float) -> None:
+    def render_suggestion_message(suggested_amount: float, additional_amount: float, currency: str = "INR") -> None:
         """
         Render suggestion message for additional investment.
         
         Args:
             suggested_amount: Suggested additional amount
             additional_amount: Current additional amount
+            currency: Base currency code
         """
         if additional_amount == 0 and suggested_amount > 0:
             st.markdown(
                 f"💡 To reach target weights exactly, consider adding "
-                f"**₹{suggested_amount:,.2f}** more to the portfolio."
+                f"**{format_currency(suggested_amount, currency)}** more to the portfolio."
             )
     
     @staticmethod
@@ -184,6 +338,67 @@ class PortfolioUIComponents:
         """
         st.error(f"Something went wrong: {error}")
     
+    @staticmethod
+    def render_save_conflict(account_id: str) -> None:
+        """
+        Render the error shown when another session saved the account first.
+        
+        Args:
+            account_id: Account that was changed elsewhere
+        """
+        st.error(
+            f"❌ Account '{account_id}' was changed in another session after you loaded it, "
+            f"so your changes were not saved. Refresh the page to load the latest holdings, then reapply your edits."
+        )
+    
+    @staticmethod
+    def render_validation_report(report: ValidationReport) -> None:
+        """
+        Render validation errors and warnings.
+        
+        Args:
+            report: Validation report for the portfolio
+        """
+        for message in report.messages("error"):
+            PortfolioUIComponents.render_error_message(message)
+        for message in report.messages("warning"):
+            st.warning(f"⚠️ {message}")
+
+    @staticmethod
+    def render_stale_prices_notice(stale: List[str], as_of: Optional[str], refreshing: bool) -> None:
+        """
+        Render a notice that some prices are last known values rather than live ones.
+
+        Args:
+            stale: Tickers and FX pairs without a fresh price
+            as_of: Time the last known prices were fetched, if any
+            refreshing: Whether fresh prices are still being fetched
+        """
+        shown = ", ".join(stale[:10]) + (f" (+{len(stale) - 10} more)" if len(stale) > 10 else "")
+        since = f" from {as_of}" if as_of else ""
+        if refreshing:
+            st.info(f"⏳ Showing last known prices{since} for {shown}. Live prices are loading and will appear automatically.")
+        else:
+            st.warning(f"⚠️ Live prices unavailable for {shown}; showing last known prices{since}.")
+
+    @staticmethod
+    def render_waiting_for_prices() -> None:
+        """Render a note explaining why the calculations are disabled."""
+        st.caption("⏳ Rebalancing, the capital sweep and risk analysis are available once live prices have loaded.")
+
+    @staticmethod
+    def render_stale_results_notice(stale: List[str], as_of: Optional[str]) -> None:
+        """
+        Label results that were calculated with last known rather than live prices.
+
+        Args:
+            stale: Tickers and FX pairs without a fresh price
+            as_of: Time the last known prices were fetched, if any
+        """
+        shown = ", ".join(stale[:10]) + (f" (+{len(stale) - 10} more)" if len(stale) > 10 else "")
+        since = f" from {as_of}" if as_of else ""
+        st.warning(f"⚠️ Stale: these results use last known prices{since} for {shown}.")
+
     @staticmethod
     def render_footer() -> None:
         """Render the application footer."""
@@ -191,16 +406,21 @@ class PortfolioUIComponents:
         st.info("Tip: Modify tickers (e.g., add '.NS'), and prices will be fetched automatically.")
     
     @staticmethod
-    def style_output(df: pd.DataFrame):
+    def style_output(df: pd.DataFrame, currency: str = "INR"):
         """
         Apply styling to the output DataFrame.
         
         Args:
             df: DataFrame to style
+            currency: Base currency code
             
         Returns:
             Styled DataFrame
         """
+        symbol = CURRENCY_SYMBOLS.get(currency, f"{currency} ")
+        # Prices stay in each ticker's quote currency when holdings are mixed
+        price_format = "{:.2f}" if "Currency" in df.columns else symbol + "{:.2f}"
+
         def highlight_action(val):
             color = "lightgray"
             if val == "Buy":
@@ -209,8 +429,10 @@ class PortfolioUIComponents:
                 color = "#fddede"
             return f"background-color: {color}"
 
-        return df.style \
-            .applymap(highlight_action, subset=["Action"]) \
+        styler = df.style
+        # Styler.applymap was renamed to Styler.map in pandas 2.1 and removed in pandas 3
+        style_cells = styler.map if hasattr(styler, "map") else styler.applymap
+        return style_cells(highlight_action, subset=["Action"]) \
             .set_properties(
                 **{
                     "background-color": "#e8f4fd",
@@ -225,10 +447,10 @@ class PortfolioUIComponents:
                 subset=["Current Value", "Current Weight (%)", "Target Shares", "Target Value", "Shares to Buy/Sell", "Real Weight (%)"]
             ) \
             .format({
-                "Current Price (per share)": "₹{:.2f}",
-                "Current Value": "₹{:.2f}",
-                "Target Value": "₹{:.2f}",
-                "Target Value (Actual)": "₹{:.2f}",
-                "Difference": "₹{:.2f}",
+                "Current Price (per share)": price_format,
+                "Current Value": symbol + "{:.2f}",
+                "Target Value": symbol + "{:.2f}",
+                "Target Value (Actual)": symbol + "{:.2f}",
+                "Difference": symbol + "{:.2f}",
                 "Real Weight (%)": "{:.2f}%"
             }) 
\ No newline at end of file
@@ -3,21 +3,40 @@ Utility functions for portfolio calculations and data processing.
 """
 import pandas as pd
 import numpy as np
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
+from utils.validation import validate_portfolio
 
-def calculate_portfolio_metrics(df: pd.DataFrame) -> Tuple[float, float, float]:
+CURRENCY_SYMBOLS = {
+    "INR": "₹",
+    "USD": "$",
+    "EUR": "€",
+    "GBP": "£",
+    "JPY": "¥",
+}
+
+
+def calculate_portfolio_metrics(df: pd.DataFrame, fx_rates: Optional[Dict[str, float]] = None) -> Tuple[float, float, float]:
     """
     Calculate key portfolio metrics.
     
+    When `fx_rates` is given and the DataFrame has a 'Currency' column, each
+    holding is converted into the base currency in one vectorized step and the
+    applied rate is kept in an 'FX Rate' column. Holdings whose currency has
+    no rate get a NaN rate and no value; `validate_portfolio` reports them.
+    
     Args:
         df: Portfolio DataFrame
+        fx_rates: Optional mapping of currency -> rate into the base currency
         
     Returns:
         Tuple of (total_value, total_current_weight, total_target_weight)
     """
+    if fx_rates is not None and "Currency" in df.columns:
+        df["FX Rate"] = df["Currency"].map(fx_rates).astype(float)
+    
     # Calculate current values
-    df["Current Value"] = df["Shares Held"] * df["Current Price (per share)"]
+    df["Current Value"] = df["Shares Held"] * _base_prices(df)
     total_value = df["Current Value"].sum()
     
     # Calculate current weights
@@ -33,6 +52,14 @@ def calculate_portfolio_metrics(df: pd.DataFrame) -> Tuple[float, float, float]:
     return total_value, total_current_weight, total_target_weight
 
 
+def _base_prices(df: pd.DataFrame) -> pd.Series:
+    """Get per-share prices converted into the base currency."""
+    prices = df["Current Price (per share)"]
+    if "FX Rate" in df.columns:
+        prices = prices * df["FX Rate"]
+    return prices
+
+
 def optimize_shares(prices: pd.Series, target_values: pd.Series) -> List[int]:
     """
     Optimize share quantities to match target values as closely as possible.
@@ -57,48 +84,32 @@ def validate_portfolio_data(df: pd.DataFrame) -> List[str]:
     """
     Validate portfolio data for common issues.
     
+    See `utils.validation.validate_portfolio` for the full structured report.
+    
     Args:
         df: Portfolio DataFrame
         
     Returns:
-        List of validation error messages
+        List of validation error messages, including offending row positions
     """
-    errors = []
-    
-    # Check for required columns
-    required_columns = ["Ticker", "Shares Held", "Target Weight (%)"]
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    if missing_columns:
-        errors.append(f"Missing required columns: {missing_columns}")
-    
-    # Check for negative values
-    if "Shares Held" in df.columns:
-        if (df["Shares Held"] < 0).any():
-            errors.append("Shares held cannot be negative")
-    
-    if "Target Weight (%)" in df.columns:
-        if (df["Target Weight (%)"] < 0).any():
-            errors.append("Target weights cannot be negative")
-    
-    # Check for empty tickers
-    if "Ticker" in df.columns:
-        if df["Ticker"].isna().any() or (df["Ticker"] == "").any():
-            errors.append("Ticker symbols cannot be empty")
-    
-    return errors
+    return validate_portfolio(df).messages("error")
 
 
-def format_currency(value: float) -> str:
+def format_currency(value: float, currency: str = "INR") -> str:
     """
-    Format value as Indian currency.
+    Format value in the given currency.
     
     Args:
         value: Numeric value
+        currency: ISO currency code
         
     Returns:
         Formatted currency string
     """
-    return f"₹{value:,.2f}"
+    symbol = CURRENCY_SYMBOLS.get(currency)
+    if symbol is None:
+        return f"{currency} {value:,.2f}"
+    return f"{symbol}{value:,.2f}"
 
 
 def format_percentage(value: float) -> str:
@@ -133,13 +144,11 @@ def calculate_rebalancing_metrics(df: pd.DataFrame, additional_capital: float =
     df["Target Value"] = (df["Target Weight (%)"] / 100.0 * new_total_value)
     
     # Optimize shares
-    df["Target Shares"] = optimize_shares(
-        df["Current Price (per share)"],
-        df["Target Value"]
-    )
+    prices = _base_prices(df)
+    df["Target Shares"] = optimize_shares(prices, df["Target Value"])
     
     # Calculate actual target values and differences
-    df["Target Value (Actual)"] = df["Target Shares"] * df["Current Price (per share)"]
+    df["Target Value (Actual)"] = df["Target Shares"] * prices
     df["Difference"] = df["Target Value (Actual)"] - df["Current Value"]
     
     # Determine actions
@@ -157,4 +166,62 @@ def calculate_rebalancing_metrics(df: pd.DataFrame, additional_capital: float =
     else:
         df["Real Weight (%)"] = 0.0
     
-    return df 
\ No newline at end of file
+    return df
+
+
+def sweep_additional_capital(df: pd.DataFrame, amounts) -> pd.DataFrame:
+    """
+    Evaluate rebalancing across a grid of additional capital amounts at once.
+    
+    Applies the same rules as `calculate_rebalancing_metrics` to every amount
+    in a single (amounts x tickers) computation.
+    
+    Args:
+        df: Portfolio DataFrame with 'Current Value' already calculated
+        amounts: Additional capital amounts to evaluate
+        
+    Returns:
+        DataFrame with one row per amount: RMS and max weight deviation,
+        residual cash and trade count
+    """
+    amounts = np.asarray(amounts, dtype=float)
+    prices = _base_prices(df).to_numpy(dtype=float)
+    target_weights = df["Target Weight (%)"].to_numpy(dtype=float)
+    shares_held = df["Shares Held"].to_numpy(dtype=float)
+    
+    # (amounts x tickers) grids
+    new_totals = df["Current Value"].sum() + amounts
+    target_values = target_weights[None, :] / 100.0 * new_totals[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        target_shares = np.where(prices > 0, np.rint(target_values / prices), 0.0)
+    actual_values = target_shares * np.nan_to_num(prices)
+    actual_totals = actual_values.sum(axis=1)
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        real_weights = np.where(actual_totals[:, None] > 0, actual_values / actual_totals[:, None] * 100, 0.0)
+    deviations = real_weights - target_weights[None, :]
+    
+    return pd.DataFrame({
+        "Additional Capital": amounts,
+        "RMS Deviation (%)": np.sqrt((deviations ** 2).mean(axis=1)).round(4),
+        "Max Deviation (%)": np.abs(deviations).max(axis=1).round(4),
+        "Residual Cash": (new_totals - actual_totals).round(2),
+        "Trades": (target_shares != shares_held[None, :]).sum(axis=1),
+    })
+
+
+def find_minimum_capital(curve: pd.DataFrame, max_deviation: float,
+                         metric: str = "Max Deviation (%)") -> Optional[float]:
+    """
+    Find the smallest additional capital whose deviation meets the target.
+    
+    Args:
+        curve: Output of `sweep_additional_capital`
+        max_deviation: Largest acceptable deviation in percentage points
+        metric: Curve column to compare against `max_deviation`
+        
+    Returns:
+        Smallest qualifying amount, or None if no amount in the grid qualifies
+    """
+    qualifying = curve.loc[curve[metric] <= max_deviation, "Additional Capital"]
+    return float(qualifying.min()) if not qualifying.empty else None
@@ -0,0 +1,136 @@
+"""
+Vectorized ex-ante risk analytics from a covariance matrix of daily returns.
+
+Weights may be a single portfolio (n,) or a batch of accounts (accounts x n);
+every metric is computed for the whole batch in one set of matrix operations.
+"""
+import pandas as pd
+import numpy as np
+from typing import Dict, Tuple
+
+from utils.portfolio_utils import _base_prices
+
+TRADING_DAYS = 252
+
+
+def _as_batch(weights: np.ndarray) -> Tuple[np.ndarray, bool]:
+    weights = np.asarray(weights, dtype=float)
+    return np.atleast_2d(weights), weights.ndim == 1
+
+
+def portfolio_variance(weights: np.ndarray, cov: np.ndarray) -> np.ndarray:
+    """
+    Daily variance w' C w of each portfolio.
+
+    Args:
+        weights: Fractional weights, (n,) or (accounts x n)
+        cov: Daily return covariance, (n x n)
+
+    Returns:
+        Scalar for one portfolio, otherwise an (accounts,) array
+    """
+    batch, single = _as_batch(weights)
+    variance = np.einsum("an,an->a", batch @ cov, batch)
+    return variance[0] if single else variance
+
+
+def portfolio_volatility(weights: np.ndarray, cov: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    """Annualized volatility of each portfolio, as a fraction."""
+    return np.sqrt(np.maximum(portfolio_variance(weights, cov), 0.0) * periods)
+
+
+def tracking_error(weights: np.ndarray, benchmark_weights: np.ndarray, cov: np.ndarray,
+                   periods: int = TRADING_DAYS) -> np.ndarray:
+    """
+    Annualized ex-ante tracking error of each portfolio against its benchmark.
+
+    For rebalancing the benchmark is the target allocation, so this measures
+    how much the current drift is expected to move returns away from target.
+    """
+    return portfolio_volatility(np.asarray(weights, dtype=float) - np.asarray(benchmark_weights, dtype=float),
+                                cov, periods)
+
+
+def risk_contribution(weights: np.ndarray, cov: np.ndarray) -> np.ndarray:
+    """
+    Share of each portfolio's variance contributed by each holding.
+
+    Contributions w_i (C w)_i / w' C w sum to 1 across a portfolio's holdings;
+    portfolios with zero variance get zero contributions.
+
+    Returns:
+        Array shaped like `weights`
+    """
+    batch, single = _as_batch(weights)
+    marginal = batch @ cov
+    variance = np.einsum("an,an->a", marginal, batch)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        contributions = np.where(variance[:, None] > 0, batch * marginal / variance[:, None], 0.0)
+    return contributions[0] if single else contributions
+
+
+def calculate_risk_metrics(df: pd.DataFrame, cov: pd.DataFrame) -> Tuple[Dict[str, float], pd.DataFrame]:
+    """
+    Calculate volatility, tracking error and risk contributions for a portfolio.
+
+    Holdings missing from `cov` (no return history) are treated as riskless.
+    `df` is left untouched, since callers may share it with other results.
+
+    Args:
+        df: Portfolio DataFrame with 'Current Value' already calculated
+        cov: Daily return covariance indexed by ticker on both axes
+
+    Returns:
+        Tuple of (dictionary with annualized 'volatility', 'target_volatility'
+        and 'tracking_error' in percent, copy of `df` with 'Risk Contribution (%)'
+        and 'Active Risk Contribution (%)' columns added)
+    """
+    values = df["Shares Held"].to_numpy(dtype=float) * _base_prices(df).to_numpy(dtype=float)
+    values = np.nan_to_num(values)
+    total = values.sum()
+    current = values / total if total > 0 else np.zeros(len(df))
+    target = df["Target Weight (%)"].to_numpy(dtype=float) / 100.0
+
+    # Align the covariance to the portfolio's rows; tickers without history get zero rows/columns
+    positions = cov.index.get_indexer(df["Ticker"])
+    known = positions >= 0
+    aligned = np.zeros((len(df), len(df)))
+    aligned[np.ix_(known, known)] = cov.to_numpy()[np.ix_(positions[known], positions[known])]
+
+    contributions = df.copy()
+    contributions["Risk Contribution (%)"] = (risk_contribution(current, aligned) * 100).round(2)
+    contributions["Active Risk Contribution (%)"] = (risk_contribution(current - target, aligned) * 100).round(2)
+    return {
+        "volatility": float(portfolio_volatility(current, aligned) * 100),
+        "target_volatility": float(portfolio_volatility(target, aligned) * 100),
+        "tracking_error": float(tracking_error(current, target, aligned) * 100),
+    }, contributions
+
+
+def batch_risk_metrics(current_weights: pd.DataFrame, target_weights: pd.DataFrame,
+                       cov: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculate volatility and tracking error for many accounts at once.
+
+    Args:
+        current_weights: Fractional current weights, accounts x tickers (0 where not held)
+        target_weights: Fractional target weights with the same shape and labels
+        cov: Daily return covariance indexed by ticker; tickers it lacks are treated as riskless
+
+    Returns:
+        DataFrame indexed by account with annualized 'Volatility (%)',
+        'Target Volatility (%)' and 'Tracking Error (%)'
+    """
+    tickers = current_weights.columns
+    positions = cov.index.get_indexer(tickers)
+    known = positions >= 0
+    current = current_weights.to_numpy(dtype=float)[:, known]
+    target = target_weights.reindex(index=current_weights.index, columns=tickers, fill_value=0.0)
+    target = target.to_numpy(dtype=float)[:, known]
+    aligned = cov.to_numpy()[np.ix_(positions[known], positions[known])]
+
+    return pd.DataFrame({
+        "Volatility (%)": portfolio_volatility(current, aligned) * 100,
+        "Target Volatility (%)": portfolio_volatility(target, aligned) * 100,
+        "Tracking Error (%)": tracking_error(current, target, aligned) * 100,
+    }, index=current_weights.index).round(4)
@@ -0,0 +1,231 @@
+"""
+Vectorized row-level validation for portfolio data.
+"""
+import pandas as pd
+import numpy as np
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+FAIL_FAST = "fail_fast"
+COLLECT_ALL = "collect_all"
+
+REQUIRED_COLUMNS = ["Ticker", "Shares Held", "Target Weight (%)"]
+PRICE_COLUMN = "Current Price (per share)"
+# Two-decimal weights rarely sum to exactly 100 (e.g. three holdings at 33.33%)
+DEFAULT_WEIGHT_TOLERANCE = 0.1
+FX_RATE_COLUMN = "FX Rate"
+CURRENCY_COLUMN = "Currency"
+
+
+@dataclass
+class ValidationIssue:
+    """One failed rule with the positional rows and values that broke it."""
+
+    rule: str
+    message: str
+    rows: np.ndarray = field(default_factory=lambda: np.array([], dtype=np.int64))
+    values: np.ndarray = field(default_factory=lambda: np.array([], dtype=object))
+    severity: str = "error"
+
+    def describe(self, max_rows: int = 10) -> str:
+        """Human-readable message including (a sample of) the offending row positions."""
+        if len(self.rows) == 0:
+            return self.message
+        shown = ", ".join(str(row) for row in self.rows[:max_rows])
+        more = f" (+{len(self.rows) - max_rows} more)" if len(self.rows) > max_rows else ""
+        label = "row" if len(self.rows) == 1 else "rows"
+        return f"{self.message} ({label} {shown}{more})"
+
+
+@dataclass
+class ValidationReport:
+    """Structured result of validating a portfolio."""
+
+    issues: List[ValidationIssue] = field(default_factory=list)
+    row_count: int = 0
+
+    @property
+    def errors(self) -> List[ValidationIssue]:
+        return [issue for issue in self.issues if issue.severity == "error"]
+
+    @property
+    def warnings(self) -> List[ValidationIssue]:
+        return [issue for issue in self.issues if issue.severity == "warning"]
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.errors
+
+    def messages(self, severity: Optional[str] = "error") -> List[str]:
+        """Describe the issues of one severity, or all issues when `severity` is None."""
+        return [issue.describe() for issue in self.issues if severity is None or issue.severity == severity]
+
+    def to_frame(self) -> pd.DataFrame:
+        """Flatten the report into one row per offending cell."""
+        frames = [
+            pd.DataFrame({
+                "Rule": issue.rule,
+                "Severity": issue.severity,
+                "Row": issue.rows,
+                "Value": issue.values,
+            })
+            for issue in self.issues
+        ]
+        if not frames:
+            return pd.DataFrame(columns=["Rule", "Severity", "Row", "Value"])
+        return pd.concat(frames, ignore_index=True)
+
+
+def _mask_issue(rule: str, message: str, mask: np.ndarray, values: pd.Series,
+                severity: str = "error") -> Optional[ValidationIssue]:
+    """Build an issue from a boolean row mask, or None if no row matched."""
+    rows = np.flatnonzero(mask)
+    if len(rows) == 0:
+        return None
+    return ValidationIssue(rule, message, rows, values.to_numpy()[rows], severity)
+
+
+def _check_empty_ticker(df: pd.DataFrame, ctx: dict) -> Optional[ValidationIssue]:
+    tickers = df["Ticker"]
+    mask = tickers.isna().to_numpy() | (tickers.astype(str).str.strip() == "").to_numpy()
+    return _mask_issue("empty_ticker", "Ticker symbols cannot be empty", mask, tickers)
+
+
+def _check_duplicate_ticker(df: pd.DataFrame, ctx: dict) -> Optional[ValidationIssue]:
+    # Duplicates are found on integer (account, ticker) keys rather than on the strings
+    ticker_codes, ticker_uniques = pd.factorize(df["Ticker"])
+    keys = ctx["account_codes"].astype(np.int64) * (len(ticker_uniques) + 1) + ticker_codes
+    mask = pd.Series(keys).duplicated(keep=False).to_numpy() & (ticker_codes >= 0)
+    return _mask_issue("duplicate_ticker", "Tickers must be unique within a portfolio", mask, df["Ticker"])
+
+
+def _check_shares(df: pd.DataFrame, ctx: dict) -> Optional[ValidationIssue]:
+    shares = ctx["shares"]
+    return _mask_issue("missing_shares", "Shares held must be a number",
+                       shares.isna().to_numpy(), df["Shares Held"])
+
+
+def _check_negative_shares(df: pd.DataFrame, ctx: dict) -> Optional[ValidationIssue]:
+    shares = ctx["shares"]
+    return _mask_issue("negative_shares", "Shares held cannot be negative", (shares < 0).to_numpy(), shares)
+
+
+def _check_weights(df: pd.DataFrame, ctx: dict) -> Optional[ValidationIssue]:
+    weights = ctx["weights"]
+    return _mask_issue("missing_weight", "Target weights must be numbers",
+                       weights.isna().to_numpy(), df["Target Weight (%)"])
+
+
+def _check_negative_weights(df: pd.DataFrame, ctx: dict) -> Optional[ValidationIssue]:
+    weights = ctx["weights"]
+    return _mask_issue("negative_weight", "Target weights cannot be negative", (weights < 0).to_numpy(), weights)
+
+
+def _check_weight_sum(df: pd.DataFrame, ctx: dict) -> Optional[ValidationIssue]:
+    weights = ctx["weights"].fillna(0.0).to_numpy(dtype=float)
+    codes = ctx["account_codes"]
+    totals = np.bincount(codes, weights=weights)[codes] if len(codes) else weights
+    mask = np.abs(totals - 100.0) > ctx["weight_tolerance"]
+    return _mask_issue("weight_sum", "Target weights should sum to 100%", mask, pd.Series(totals.round(4)), "warning")
+
+
+def _check_missing_price(df: pd.DataFrame, ctx: dict) -> Optional[ValidationIssue]:
+    prices = ctx["prices"]
+    if prices is None:
+        return None
+    # Rebalancing an unpriced holding would sell it off, so this blocks like any other error
+    return _mask_issue("missing_price", "Current price is missing", prices.isna().to_numpy(), df["Ticker"])
+
+
+def _check_non_positive_price(df: pd.DataFrame, ctx: dict) -> Optional[ValidationIssue]:
+    prices = ctx["prices"]
+    if prices is None:
+        return None
+    return _mask_issue("non_positive_price", "Current price must be positive", (prices <= 0).to_numpy(), prices)
+
+
+def _unknown_currency_mask(df: pd.DataFrame) -> np.ndarray:
+    currencies = df[CURRENCY_COLUMN]
+    return (currencies.isna() | (currencies.astype(str).str.strip() == "")).to_numpy()
+
+
+def _check_unknown_currency(df: pd.DataFrame, ctx: dict) -> Optional[ValidationIssue]:
+    # Only priced frames carry an FX Rate column; before that the currency is not needed yet
+    if FX_RATE_COLUMN not in df.columns or CURRENCY_COLUMN not in df.columns:
+        return None
+    return _mask_issue("unknown_currency", "Quote currency is unknown; set it in the Currency column",
+                       _unknown_currency_mask(df), df["Ticker"])
+
+
+def _check_missing_fx_rate(df: pd.DataFrame, ctx: dict) -> Optional[ValidationIssue]:
+    # Only priced frames carry an FX Rate column; a missing rate would drop the holding from the total
+    if FX_RATE_COLUMN not in df.columns:
+        return None
+    mask = pd.to_numeric(df[FX_RATE_COLUMN], errors="coerce").isna().to_numpy()
+    if CURRENCY_COLUMN not in df.columns:
+        return _mask_issue("missing_fx_rate", "No FX rate to convert this currency into the base currency",
+                           mask, df["Ticker"])
+    # Holdings of unknown currency are reported by their own rule
+    return _mask_issue("missing_fx_rate", "No FX rate to convert this currency into the base currency",
+                       mask & ~_unknown_currency_mask(df), df[CURRENCY_COLUMN])
+
+
+# Rules run in this order; each returns an issue or None
+RULES: List[Callable[[pd.DataFrame, dict], Optional[ValidationIssue]]] = [
+    _check_empty_ticker,
+    _check_shares,
+    _check_negative_shares,
+    _check_weights,
+    _check_negative_weights,
+    _check_duplicate_ticker,
+    _check_weight_sum,
+    _check_missing_price,
+    _check_non_positive_price,
+    _check_unknown_currency,
+    _check_missing_fx_rate,
+]
+
+
+def validate_portfolio(df: pd.DataFrame, mode: str = COLLECT_ALL, weight_tolerance: float = DEFAULT_WEIGHT_TOLERANCE,
+                       account_column: Optional[str] = "Account") -> ValidationReport:
+    """
+    Validate portfolio data with every rule evaluated as a vectorized mask.
+
+    Args:
+        df: Portfolio DataFrame, optionally holding many accounts
+        mode: COLLECT_ALL to run every rule, FAIL_FAST to stop at the first error
+        weight_tolerance: Allowed distance of each account's weight total from 100
+        account_column: Column grouping rows into accounts; ignored if absent
+
+    Returns:
+        ValidationReport listing each failed rule with its row positions and values
+    """
+    if mode not in (FAIL_FAST, COLLECT_ALL):
+        raise ValueError(f"Unknown validation mode: {mode}")
+
+    report = ValidationReport(row_count=len(df))
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        report.issues.append(ValidationIssue("missing_columns", f"Missing required columns: {missing_columns}"))
+        return report
+
+    # Numeric columns and account codes are computed once and shared by all rules
+    if account_column in df.columns:
+        account_codes, _ = pd.factorize(df[account_column], use_na_sentinel=False)
+    else:
+        account_codes = np.zeros(len(df), dtype=np.int64)
+    ctx = {
+        "weight_tolerance": weight_tolerance,
+        "account_codes": account_codes,
+        "shares": pd.to_numeric(df["Shares Held"], errors="coerce"),
+        "weights": pd.to_numeric(df["Target Weight (%)"], errors="coerce"),
+        "prices": pd.to_numeric(df[PRICE_COLUMN], errors="coerce") if PRICE_COLUMN in df.columns else None,
+    }
+    for rule in RULES:
+        issue = rule(df, ctx)
+        if issue is None:
+            continue
+        report.issues.append(issue)
+        if mode == FAIL_FAST and issue.severity == "error":
+            break
+    return report